@@ -0,0 +1,283 @@
+import argparse
+import http.server
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from http_probe import listen_targets
+from nginx_config import get_config
+from runner import discover_controls
+from transport import RootTransport, use_transport
+
+DEFAULT_WORKDIR = os.path.expanduser("~/.cache/cis-nginx-audit/bench")
+
+# Controles que escalan con el arbol de /etc/nginx y los que escalan con la configuracion
+TREE_CONTROLS = ("2.3.1", "2.3.2")
+CONFIG_CONTROLS = ("2.1.4", "2.2.1", "2.4.1", "2.4.3", "2.4.4")
+# 2.4.2 prueba en vivo: escala con las direcciones listen, servidas por stubs en loopback
+LIVE_CONTROLS = ("2.4.2",)
+DEFAULT_FILES = (10, 1000, 100000)
+DEFAULT_SERVERS = (1, 100, 10000)
+DEFAULT_LISTENS = (1, 10, 100)
+LISTEN_BASE_PORT = 18080
+FILES_PER_DIR = 256
+FIXTURE_USERS = 1000   # cuentas extra en passwd/group, como un host con LDAP local
+
+
+def _write(path, text, mode=0o644):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    os.chmod(path, mode)
+
+
+def make_accounts(root, users=FIXTURE_USERS):
+    """etc/passwd and etc/group with the service accounts plus many regular users"""
+    passwd = [
+        "root:x:0:0:root:/root:/bin/bash",
+        "nobody:x:65534:65534:nobody:/nonexistent:/usr/sbin/nologin",
+        "nginx:x:990:990:nginx:/var/cache/nginx:/sbin/nologin",
+    ]
+    group = ["root:x:0:", "nogroup:x:65534:", "nginx:x:990:"]
+    for i in range(users):
+        passwd.append(f"user{i}:x:{2000 + i}:{2000 + i}::/home/user{i}:/bin/bash")
+        group.append(f"user{i}:x:{2000 + i}:")
+    # grupos suplementarios grandes: los que recorre getgrouplist
+    for i in range(users // 100):
+        members = ",".join(f"user{j}" for j in range(i * 100, i * 100 + 100))
+        group.append(f"team{i}:x:{5000 + i}:{members}")
+    _write(os.path.join(root, "etc/passwd"), "\n".join(passwd) + "\n")
+    _write(os.path.join(root, "etc/group"), "\n".join(group) + "\n")
+
+
+def make_config(root, servers, listen_base=None):
+    """etc/nginx/nginx.conf with one http block and the given number of server blocks.
+
+    With listen_base, server i listens on its own loopback port listen_base + i.
+    """
+    lines = [
+        "user nginx;",
+        "worker_processes auto;",
+        "events {",
+        "    worker_connections 1024;",
+        "}",
+        "http {",
+        "    keepalive_timeout 10;",
+        "    send_timeout 10;",
+        "    autoindex off;",
+    ]
+    for i in range(servers):
+        tls = i % 2 == 1
+        listen = f"127.0.0.1:{listen_base + i}" if listen_base is not None else "443 ssl" if tls else "80"
+        lines += [
+            "    server {",
+            f"        listen {listen};",
+            f"        server_name site{i}.example.com;",
+            # uno de cada diez server rompe 2.4.3, para que haya hallazgos que construir
+            "        keepalive_timeout 65;" if i % 10 == 9 else "        keepalive_timeout 5;",
+            "        location / {",
+            f"            root /usr/share/nginx/site{i};",
+            "        }",
+            "    }",
+        ]
+    lines.append("}")
+    _write(os.path.join(root, "etc/nginx/nginx.conf"), "\n".join(lines) + "\n")
+
+
+def make_tree(root, files):
+    """files entries below etc/nginx (nginx.conf included), FILES_PER_DIR per directory"""
+    top = os.path.join(root, "etc/nginx")
+    for i in range(max(0, files - 1)):
+        path = os.path.join(top, "html", f"d{i // FILES_PER_DIR:04d}", f"page{i}.html")
+        if i % FILES_PER_DIR == 0:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(f"<h1>{i}</h1>\n")
+        # uno de cada cien archivos con permisos de mas (hallazgo de 2.3.2)
+        os.chmod(path, 0o666 if i % 100 == 99 else 0o644)
+
+
+def fixture(workdir, kind, size, regenerate=False):
+    """Root directory for one synthetic host, built once and reused between runs"""
+    root = os.path.join(workdir, f"{kind}-{size}")
+    stamp = os.path.join(root, ".complete")
+    if os.path.exists(stamp) and not regenerate:
+        return root
+    shutil.rmtree(root, ignore_errors=True)
+    make_accounts(root)
+    if kind == "listen":
+        make_config(root, size, listen_base=LISTEN_BASE_PORT)
+    else:
+        make_config(root, size if kind == "servers" else 1)
+    if kind == "files":
+        make_tree(root, size)
+    _write(os.path.join(root, "var/run/nginx.pid"), "1\n")
+    open(stamp, "w").close()
+    return root
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    """Answers every request like an NGINX listener: 404, or 200 on one port in ten"""
+    protocol_version = "HTTP/1.1"  # keep-alive, como nginx: una conexion por listener
+
+    def do_GET(self):
+        accepts = (self.server.server_address[1] - LISTEN_BASE_PORT) % 10 == 9
+        self.send_response(200 if accepts else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class LiveRootTransport(RootTransport):
+    """RootTransport whose live probes go to the stub listeners of this machine"""
+    live = True
+
+
+def start_listeners(root):
+    """One stub HTTP server per listen address of the root's config, in daemon threads"""
+    with use_transport(RootTransport(root)):
+        targets = listen_targets(get_config())
+    servers = []
+    for target in targets:
+        server = http.server.ThreadingHTTPServer((target.host, target.port), _StubHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def _proc_io():
+    """Counters of /proc/self/io (rchar, syscr, syscw...), or {} where it does not exist.
+
+    syscr/syscw count only read()/write()-type calls: the stat, getdents and open calls
+    that dominate the tree scans of 2.3.1 and 2.3.2 are not in them.
+    """
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {k: int(v) for k, v in (line.split(":") for line in f)}
+    except OSError:
+        return {}
+
+
+def run_case(control_id, root, min_time=1.0, min_runs=3):
+    """Time check() of one control against a root; every run starts with cold caches"""
+    control = discover_controls([control_id])[0]
+    live = control_id in LIVE_CONTROLS
+    # los stubs corren en este proceso: su CPU tambien cuenta en cpu_ms_per_op
+    listeners = start_listeners(root) if live else []
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    io_before = _proc_io()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    runs = 0
+    result = None
+    while runs < min_runs or time.perf_counter() - start < min_time:
+        # transporte nuevo en cada vuelta: ni la config ni el arbol quedan en memoria
+        with use_transport(LiveRootTransport(root) if live else RootTransport(root)):
+            result = control.check()
+        runs += 1
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    io_after = _proc_io()
+    for server in listeners:
+        server.shutdown()
+        server.server_close()
+    io = {k: (io_after[k] - io_before[k]) / runs for k in ("syscr", "syscw", "rchar") if k in io_after}
+    return {
+        "control": control_id,
+        "runs": runs,
+        "ops_per_sec": round(runs / elapsed, 3),
+        "ms_per_op": round(elapsed / runs * 1000, 3),
+        "cpu_ms_per_op": round(cpu / runs * 1000, 3),
+        # ru_maxrss esta en KiB en Linux
+        "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "baseline_rss_mib": round(baseline_rss / 1024, 1),
+        "read_calls_per_op": round(io["syscr"], 1) if "syscr" in io else None,
+        "write_calls_per_op": round(io["syscw"], 1) if "syscw" in io else None,
+        "bytes_read_per_op": round(io["rchar"]) if "rchar" in io else None,
+        "status": result["status"],
+        "findings": len(result.get("findings") or ()),
+    }
+
+
+def measure(control_id, root, min_time, min_runs):
+    """run_case in a fresh interpreter, so peak RSS and I/O belong to that case alone"""
+    cmd = [sys.executable, os.path.abspath(__file__), "--case", control_id, root,
+           "--min-time", str(min_time), "--min-runs", str(min_runs)]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        return {"control": control_id, "status": "ERROR", "output": result.stderr.strip().splitlines()[-1:]}
+    return json.loads(result.stdout)
+
+
+def print_table(rows, out=sys.stdout):
+    header = ("control", "fixture", "runs", "ops/s", "ms/op", "cpu ms/op", "peak RSS MiB",
+              "read() calls/op", "write() calls/op", "KiB read/op", "status")
+    table = [header]
+    for r in rows:
+        if r["status"] == "ERROR":
+            table.append((r["control"], r["fixture"], "-", "-", "-", "-", "-", "-", "-", "-", "ERROR"))
+            continue
+        kib = r["bytes_read_per_op"] / 1024 if r["bytes_read_per_op"] is not None else None
+        table.append((
+            r["control"], r["fixture"], str(r["runs"]), f"{r['ops_per_sec']:.2f}", f"{r['ms_per_op']:.2f}",
+            f"{r['cpu_ms_per_op']:.2f}", f"{r['peak_rss_mib']:.1f}",
+            "-" if r["read_calls_per_op"] is None else f"{r['read_calls_per_op']:.0f}",
+            "-" if r["write_calls_per_op"] is None else f"{r['write_calls_per_op']:.0f}",
+            "-" if kib is None else f"{kib:.1f}",
+            f"{r['status']} ({r['findings']})",
+        ))
+    widths = [max(len(row[i]) for row in table) for i in range(len(header))]
+    for row in table:
+        out.write("  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip() + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark control checks against synthetic NGINX hosts",
+        epilog="read()/write() calls come from /proc/self/io and leave out stat, getdents and open calls"
+    )
+    parser.add_argument("--only", nargs="+", metavar="ID", help=f"only these controls (default {' '.join(TREE_CONTROLS + CONFIG_CONTROLS + LIVE_CONTROLS)})")
+    parser.add_argument("--files", nargs="+", type=int, default=DEFAULT_FILES, metavar="N", help="sizes of the /etc/nginx trees for the tree controls")
+    parser.add_argument("--servers", nargs="+", type=int, default=DEFAULT_SERVERS, metavar="N", help="server blocks in nginx.conf for the config controls")
+    parser.add_argument("--listens", nargs="+", type=int, default=DEFAULT_LISTENS, metavar="N", help=f"loopback listen addresses (ports from {LISTEN_BASE_PORT}) for the live controls")
+    parser.add_argument("--min-time", type=float, default=1.0, metavar="SECONDS", help="repeat each case at least this long")
+    parser.add_argument("--min-runs", type=int, default=3, help="repeat each case at least this many times")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="where the synthetic roots are generated and kept")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild the synthetic roots even if they exist")
+    parser.add_argument("-o", "--output", help="also write the measurements as JSON to this file")
+    parser.add_argument("--case", nargs=2, metavar=("ID", "ROOT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case[0], args.case[1], args.min_time, args.min_runs)))
+        return 0
+
+    selected = set(args.only) if args.only else None
+    cases = [("files", size, c) for size in args.files for c in TREE_CONTROLS]
+    cases += [("servers", size, c) for size in args.servers for c in CONFIG_CONTROLS]
+    cases += [("listen", size, c) for size in args.listens for c in LIVE_CONTROLS]
+    rows = []
+    for kind, size, control_id in cases:
+        if selected is not None and control_id not in selected:
+            continue
+        root = fixture(args.workdir, kind, size, args.regenerate)
+        row = measure(control_id, root, args.min_time, args.min_runs)
+        row["fixture"] = f"{kind}={size}"
+        rows.append(row)
+        sys.stderr.write(f"{control_id} {kind}={size}: {row.get('ops_per_sec', 'ERROR')} ops/s\n")
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": rows}, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
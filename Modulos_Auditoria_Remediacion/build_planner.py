@@ -0,0 +1,176 @@
+import contextlib
+import contextvars
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+from nginx_build import DEFAULT_MODULES, get_build_info
+from profiling import run_command
+
+NGINX_VERSION = "1.26.1"
+BUILD_DEPS = ["gcc", "make", "wget", "tar", "zlib-devel", "pcre-devel", "openssl-devel"]
+BASE_FLAGS = ["--with-http_ssl_module"]
+CACHE_DIR = "/var/cache/cis-nginx-audit/build"
+DOWNLOAD_URL = "http://nginx.org/download"
+
+# Modulos del binario actual que no se pueden recompilar solo con BUILD_DEPS
+NEEDS_EXTRA_DEPS = {
+    "http_image_filter_module", "http_xslt_module", "http_perl_module",
+    "http_geoip_module", "stream_geoip_module", "google_perftools_module",
+}
+# --with-mail / --with-stream sin "=dynamic": los modulos dinamicos van en paquetes aparte
+_MODULE_FLAG_RE = re.compile(r"--with(out)?-(\w+_module|mail|stream|threads|file-aio|compat|pcre-jit)$")
+
+
+def module_flags(configure_args):
+    """Static --with-*/--without-* module flags of a build; paths and compiler options are dropped"""
+    flags = []
+    for arg in configure_args:
+        match = _MODULE_FLAG_RE.match(arg)
+        if match is not None and match.group(2) not in NEEDS_EXTRA_DEPS:
+            flags.append(arg)
+    return flags
+
+
+class BuildPlan:
+    """configure flags requested by every failing module control, built once"""
+
+    def __init__(self, version=NGINX_VERSION, cache_dir=CACHE_DIR):
+        self.version = version
+        self.cache_dir = cache_dir
+        self.flags = []          # flags pedidos, en orden y sin repetir
+        self.requested_by = []
+        self.result = None
+
+    def require(self, control_id, flags):
+        self.requested_by.append(control_id)
+        for flag in flags:
+            if flag not in self.flags:
+                self.flags.append(flag)
+
+    def configure_args(self):
+        """Module flags of the current build merged with every requested flag (requests win on conflicts).
+
+        Only module flags are kept: --prefix, --sbin-path, --with-cc/ld-opt and the like belong
+        to the packaged binary, and reusing them would install over the rpm's files.
+        """
+        try:
+            info = get_build_info()
+            current = module_flags(info.configure_args) if info.ok else []
+        except FileNotFoundError:
+            current = []
+
+        args = []
+        for flag in current + BASE_FLAGS + self.flags:
+            name = flag.partition("=")[0]
+            if name.startswith("--without-"):
+                module = name[len("--without-"):]
+                args = [a for a in args if a != f"--with-{module}"]
+                # --without-* solo existe para modulos que se compilan por defecto
+                if module not in DEFAULT_MODULES:
+                    continue
+            elif name.startswith("--with-") and "=" not in flag:
+                module = name[len("--with-"):]
+                args = [a for a in args if a != f"--without-{module}"]
+            # un flag con valor (--prefix=...) reemplaza al anterior
+            args = [a for a in args if a.partition("=")[0] != name]
+            args.append(flag)
+        return args
+
+    def _tarball(self):
+        return os.path.join(self.cache_dir, f"nginx-{self.version}.tar.gz")
+
+    def fetch(self):
+        """Download and verify the source tarball once; later builds reuse the cached copy"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tarball = self._tarball()
+        stamp = tarball + ".sha256"
+        if os.path.exists(tarball) and os.path.exists(stamp):
+            with open(stamp, "r") as f:
+                if f.read().strip() == _sha256(tarball):
+                    return tarball
+
+        url = f"{DOWNLOAD_URL}/nginx-{self.version}.tar.gz"
+        part = tarball + ".part"
+        run_command(["wget", "-q", url, "-O", part], check=True)
+        if shutil.which("gpg"):
+            # firma PGP publicada por nginx.org (la clave debe estar en el llavero)
+            run_command(["wget", "-q", url + ".asc", "-O", part + ".asc"], check=True)
+            run_command(["gpg", "--verify", part + ".asc", part], check=True)
+            os.remove(part + ".asc")
+        else:
+            run_command(["tar", "-tzf", part], stdout=subprocess.DEVNULL, check=True)
+        os.replace(part, tarball)
+        with open(stamp, "w") as f:
+            f.write(_sha256(tarball) + "\n")
+        return tarball
+
+    def extract(self, tarball):
+        """Extract the tarball once into the cache"""
+        source = os.path.join(self.cache_dir, f"nginx-{self.version}")
+        marker = os.path.join(source, ".extracted")
+        if not os.path.exists(marker):
+            shutil.rmtree(source, ignore_errors=True)
+            run_command(["tar", "-xzf", tarball, "-C", self.cache_dir], check=True)
+            open(marker, "w").close()
+        return source
+
+    def execute(self):
+        """Install deps, then one configure + parallel make + make install"""
+        run_command(["dnf", "install", "-y", *BUILD_DEPS], check=True)
+        source = self.extract(self.fetch())
+        args = self.configure_args()
+        jobs = str(os.cpu_count() or 1)
+        run_command(["./configure", *args], cwd=source, check=True)
+        run_command(["make", f"-j{jobs}"], cwd=source, check=True)
+        run_command(["make", "install"], cwd=source, check=True)
+        self.result = {
+            "status": "REMEDIATED",
+            "output": f"NGINX {self.version} rebuilt once for {', '.join(self.requested_by)}",
+            "configure": args
+        }
+        return self.result
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_current = contextvars.ContextVar("build_plan", default=None)
+
+
+@contextlib.contextmanager
+def build_batch():
+    """Collect build requests from several remediations and compile once at the end"""
+    plan = BuildPlan()
+    token = _current.set(plan)
+    try:
+        yield plan
+    finally:
+        _current.reset(token)
+    if plan.flags:
+        try:
+            plan.execute()
+        except (subprocess.CalledProcessError, OSError) as e:
+            # OSError: binario ausente (dnf, wget, tar) o cache no escribible
+            plan.result = {"status": "ERROR", "output": str(e)}
+
+
+def request_build(control_id, flags):
+    """Build with these flags now, or queue them if a build batch is open (returns None)"""
+    plan = _current.get()
+    if plan is not None:
+        plan.require(control_id, flags)
+        return None
+    plan = BuildPlan()
+    plan.require(control_id, flags)
+    try:
+        return plan.execute()
+    except (subprocess.CalledProcessError, OSError) as e:
+        plan.result = {"status": "ERROR", "output": str(e)}
+        raise
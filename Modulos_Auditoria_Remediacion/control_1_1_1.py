@@ -1,27 +1,28 @@
 import subprocess
-import json
+from findings import Finding, dumps
+from profiling import run_command
+from transport import get_transport
 
 class control_1_1_1:
     def __init__(self):
         self.id = "1.1.1"
         self.title = "Ensure NGINX is installed"
         self.description = "Verify that NGINX is installed on the system."
+        # Archivos/directorios (o comandos del PATH) de los que depende check()
+        self.inputs = ["nginx"]
 
     def check(self):
         """Audit: check if nginx is installed by running 'nginx -v'"""
         try:
-            result = subprocess.run(
-                ["nginx", "-v"],
-                stderr=subprocess.PIPE,  # nginx -v prints to stderr
-                stdout=subprocess.PIPE,
-                text=True
-            )
+            result = get_transport().run(["nginx", "-v"])  # nginx -v prints to stderr
             if result.returncode == 0 and "nginx" in result.stderr.lower():
                 return {"id": self.id, "status": "PASS", "output": result.stderr.strip()}
             else:
-                return {"id": self.id, "status": "FAIL", "output": "Nginx not detected"}
+                return {"id": self.id, "status": "FAIL", "output": "Nginx not detected",
+                        "findings": [Finding(self.id, "nginx", expected="installed", actual="not detected", severity="high")]}
         except FileNotFoundError:
-            return {"id": self.id, "status": "FAIL", "output": "Nginx command not found"}
+            return {"id": self.id, "status": "FAIL", "output": "Nginx command not found",
+                    "findings": [Finding(self.id, "nginx", expected="installed", actual="not found", severity="high")]}
 
     def remediate(self):
         """Apply remediation: install nginx (example with dnf for RHEL/Fedora)"""
@@ -40,7 +41,7 @@ EOF""",
                 "dnf install -y nginx"
             ]
             for cmd in commands:
-                subprocess.run(cmd, shell=True, check=True)
+                run_command(cmd, shell=True, check=True)
             return {"id": self.id, "status": "REMEDIATED", "output": "Nginx installed successfully"}
         except subprocess.CalledProcessError as e:
             return {"id": self.id, "status": "ERROR", "output": str(e)}
@@ -48,7 +49,7 @@ EOF""",
     def report(self):
         """Generate a JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
     
     # Ejemplo de uso
 if __name__ == "__main__":
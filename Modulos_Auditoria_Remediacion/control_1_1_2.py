@@ -1,5 +1,7 @@
 import subprocess
-import json
+from findings import Finding, dumps
+from build_planner import NGINX_VERSION, request_build
+from transport import get_transport
 import os
 
 class control_1_1_2:
@@ -7,52 +9,48 @@ class control_1_1_2:
         self.id = "1.1.2"
         self.title = "Ensure NGINX is installed from source"
         self.description = "Verify that NGINX is installed from source and not from package manager."
+        self.inputs = ["nginx"]
 
     def check(self):
         """Audit: check if nginx is installed by running 'nginx -v'"""
         try:
-            result = subprocess.run(
-                ["nginx", "-v"],
-                stderr=subprocess.PIPE,  # nginx -v prints to stderr
-                stdout=subprocess.PIPE,
-                universal_newlines=True
-            )
+            result = get_transport().run(["nginx", "-v"])  # nginx -v prints to stderr
             if result.returncode == 0 and "nginx" in result.stderr.lower():
                 return {"id": self.id, "status": "PASS", "output": result.stderr.strip()}
             else:
-                return {"id": self.id, "status": "FAIL", "output": "Nginx not detected"}
+                return {"id": self.id, "status": "FAIL", "output": "Nginx not detected",
+                        "findings": [Finding(self.id, "nginx", expected="installed", actual="not detected", severity="high")]}
         except FileNotFoundError:
-            return {"id": self.id, "status": "FAIL", "output": "Nginx command not found"}
+            return {"id": self.id, "status": "FAIL", "output": "Nginx command not found",
+                    "findings": [Finding(self.id, "nginx", expected="installed", actual="not found", severity="high")]}
 
     def remediate(self):
         """Apply remediation: build and install nginx from source"""
         try:
-            # Dependencias necesarias
-            deps = "gcc make wget tar zlib-devel pcre-devel openssl-devel"
-            subprocess.run(f"dnf install -y {deps}", shell=True, check=True)
-
-            # Descargar y compilar la última versión de nginx (ejemplo: 1.26.1)
-            version = "1.26.1"
-            url = f"http://nginx.org/download/nginx-{version}.tar.gz"
-            commands = [
-                f"wget {url} -O /tmp/nginx.tar.gz",
-                "cd /tmp && tar -xvf nginx.tar.gz",
-                f"cd /tmp/nginx-{version} && ./configure --with-http_ssl_module --without-http_autoindex_module",
-                f"cd /tmp/nginx-{version} && make",
-                f"cd /tmp/nginx-{version} && make install"
-            ]
-
-            for cmd in commands:
-                subprocess.run(cmd, shell=True, check=True)
-
-            return {"id": self.id, "status": "REMEDIATED", "output": f"Nginx {version} installed from source"}
-        except subprocess.CalledProcessError as e:
-            return {"id": self.id, "status": "ERROR", "output": str(e)}
+            # una sola compilacion compartida con 1.1.2, 2.1.2 y 2.1.3
+            build = request_build(self.id, ["--with-http_ssl_module", "--without-http_autoindex_module"])
+            if build is None:
+                return {
+                    "id": self.id,
+                    "status": "PLANNED",
+                    "output": "Queued for the shared NGINX build (without http_autoindex_module)"
+                }
+            return {
+                "id": self.id,
+                "status": "REMEDIATED",
+                "output": f"NGINX {NGINX_VERSION} recompiled without http_autoindex_module"
+            }
+        except (subprocess.CalledProcessError, OSError) as e:
+            return {
+                "id": self.id,
+                "status": "ERROR",
+                "output": str(e)
+            }
 
     def report(self):
         """Generate a JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
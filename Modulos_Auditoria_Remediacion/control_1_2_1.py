@@ -1,32 +1,34 @@
 import subprocess
-import json
+from findings import Finding, dumps
+from profiling import run_command
+from packages import REPOS_DIR, get_package_state, reset_package_state
 
 class control_1_2_1:
     def __init__(self):
         self.id = "1.2.1"
         self.title = "Ensure package manager repositories are properly configured"
         self.description = "Verify that package manager repositories are correctly configured to receive security updates."
+        self.inputs = [REPOS_DIR]
 
     def check(self):
         """Audit: check if nginx-stable repo is present"""
         try:
-            result = subprocess.run(
-                ["dnf", "repolist", "-v", "nginx-stable"],
-                stderr=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                universal_newlines=True
-            )
-            if result.returncode == 0 and "nginx-stable" in result.stdout:
+            state = get_package_state("nginx")
+            if state.repos_error:
+                # sin la lista de repositorios no se puede afirmar que falte
+                return {"id": self.id, "status": "ERROR", "output": f"Failed to list repositories: {state.repos_error}"}
+            if "nginx-stable" in state.repos:
                 return {"id": self.id, "status": "PASS", "output": "nginx-stable repo is configured"}
             else:
-                return {"id": self.id, "status": "FAIL", "output": "nginx-stable repo not found"}
-        except FileNotFoundError:
-            return {"id": self.id, "status": "ERROR", "output": "dnf command not found"}
+                return {"id": self.id, "status": "FAIL", "output": "nginx-stable repo not found",
+                        "findings": [Finding(self.id, REPOS_DIR, expected="nginx-stable", actual="not configured", severity="low")]}
+        except FileNotFoundError as e:
+            return {"id": self.id, "status": "ERROR", "output": str(e)}
 
     def remediate(self):
         """Remediation: configure nginx.org stable repository"""
         try:
-            repo_config = """cat << EOF > /etc/yum.repos.d/nginx.repo
+            repo_config = f"""cat << EOF > {REPOS_DIR}/nginx.repo
 [nginx-stable]
 name=nginx stable repo
 baseurl=http://nginx.org/packages/rhel/8/$basearch/
@@ -35,7 +37,8 @@ enabled=1
 gpgkey=https://nginx.org/keys/nginx_signing.key
 module_hotfixes=true
 EOF"""
-            subprocess.run(repo_config, shell=True, check=True)
+            run_command(repo_config, shell=True, check=True)
+            reset_package_state("nginx")
             return {"id": self.id, "status": "REMEDIATED", "output": "nginx-stable repo configured"}
         except subprocess.CalledProcessError as e:
             return {"id": self.id, "status": "ERROR", "output": str(e)}
@@ -43,7 +46,7 @@ EOF"""
     def report(self):
         """Generate a JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,8 +1,11 @@
 import subprocess
 import json
+from findings import Finding, dumps
 import logging
 import os
 from typing import Dict, Any
+from packages import get_package_state, reset_package_state
+from transport import get_transport
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -13,18 +16,15 @@ class control_1_2_2:
         self.id = "1.2.2"
         self.title = "Ensure the latest software package is installed"
         self.description = "Verify that the latest version of NGINX is installed."
+        self.inputs = None  # depende del estado remoto de los repositorios
 
     def _run_command(self, cmd: list, check: bool = False) -> subprocess.CompletedProcess:
         """Ejecutar comando de forma segura"""
         try:
-            return subprocess.run(
-                cmd,
-                stderr=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                universal_newlines=True,
-                check=check,
-                timeout=30  # Timeout de seguridad
-            )
+            result = get_transport().run(cmd, timeout=30)  # Timeout de seguridad
+            if check and result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+            return result
         except subprocess.TimeoutExpired:
             raise Exception(f"Command timed out: {' '.join(cmd)}")
         except subprocess.CalledProcessError as e:
@@ -41,44 +41,43 @@ class control_1_2_2:
         try:
             logger.info(f"Checking NGINX package status for control {self.id}")
             
-            # Verificar información del paquete instalado
-            result_info = self._run_command(["dnf", "info", "nginx"])
-            
-            if result_info.returncode != 0:
+            # Estado del paquete compartido (rpmdb + una sola consulta a dnf, con cache)
+            state = get_package_state("nginx")
+
+            if state.installed is None:
                 return {
                     "id": self.id,
                     "status": "FAIL",
                     "output": "NGINX package not installed",
-                    "details": result_info.stderr.strip()
+                    "details": state.info,
+                    "findings": [Finding(self.id, "nginx", expected="installed", actual="not installed", severity="high")]
                 }
-            
-            # Verificar actualizaciones disponibles
-            result_update = self._run_command(["dnf", "check-update", "nginx"])
-            
+
             # dnf check-update retorna 100 si hay actualizaciones disponibles
-            if result_update.returncode == 100:
+            if state.update_available:
                 return {
                     "id": self.id,
                     "status": "FAIL",
                     "output": "NGINX update available",
-                    "details": result_update.stdout.strip(),
-                    "current_info": result_info.stdout.strip()
+                    "details": state.update_output,
+                    "findings": [Finding(self.id, "nginx", expected="latest", actual=state.installed)],
+                    "current_info": state.info
                 }
-            elif result_update.returncode == 0:
+            elif state.update_code == 0:
                 return {
                     "id": self.id,
                     "status": "PASS",
                     "output": "NGINX is up to date",
-                    "current_info": result_info.stdout.strip()
+                    "current_info": state.info
                 }
             else:
                 return {
                     "id": self.id,
                     "status": "ERROR",
                     "output": "Failed to check for updates",
-                    "details": result_update.stderr.strip()
+                    "details": state.update_error
                 }
-                
+
         except Exception as e:
             logger.error(f"Error during check: {e}")
             return {
@@ -102,6 +101,7 @@ class control_1_2_2:
             
             # Actualizar el paquete
             result = self._run_command(["dnf", "update", "-y", "nginx"], check=True)
+            reset_package_state("nginx")
             
             logger.info("NGINX package updated successfully")
             return {
@@ -123,7 +123,7 @@ class control_1_2_2:
         """Generate a JSON report"""
         try:
             result = self.check()
-            return json.dumps(result, indent=4)
+            return dumps(result, indent=4)
         except Exception as e:
             error_result = {
                 "id": self.id,
@@ -1,33 +1,35 @@
-import subprocess
-import json
+from findings import Finding, dumps
+from nginx_build import get_build_info
 
 class control_2_1_1:
     def __init__(self):
         self.id = "2.1.1"
         self.title = "Ensure only required modules are installed"
         self.description = "Audit NGINX to verify only the necessary modules are installed."
+        self.inputs = ["nginx"]
 
     def check(self):
         """Audit: list all modules included in NGINX build"""
         try:
-            result = subprocess.run(
-                "nginx -V",
-                shell=True,
-                stderr=subprocess.STDOUT,
-                stdout=subprocess.PIPE,
-                universal_newlines=True
-            )
-            if result.returncode == 0:
+            info = get_build_info()
+            if info.ok:
+                # una linea por argumento de configure en lugar del volcado completo
                 return {
                     "id": self.id,
                     "status": "PASS",
-                    "output": result.stdout.strip()
+                    "output": f"nginx version: {info.version}",
+                    "findings": [
+                        Finding(self.id, "nginx", actual=arg, severity="info", message="configure argument")
+                        for arg in info.configure_args
+                    ]
                 }
             else:
                 return {
                     "id": self.id,
                     "status": "FAIL",
-                    "output": "Failed to retrieve NGINX build info"
+                    "output": "Failed to retrieve NGINX build info",
+                    "findings": [Finding(self.id, "nginx -V", expected="exit code 0", actual=f"exit code {info.returncode}",
+                                         message="build info")]
                 }
         except FileNotFoundError:
             return {
@@ -54,7 +56,7 @@ class control_2_1_1:
     def report(self):
         """Generate a JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,23 +1,19 @@
 import subprocess
-import json
+from findings import Finding, dumps
+from build_planner import NGINX_VERSION, request_build
+from nginx_build import get_build_info
 
 class control_2_1_2:
     def __init__(self):
         self.id = "2.1.2"
         self.title = "Ensure HTTP WebDAV module is not installed"
         self.description = "Verify that the http_dav_module is not compiled into NGINX."
+        self.inputs = ["nginx"]
 
     def check(self):
         """Audit: verify nginx is not compiled with http_dav_module"""
         try:
-            result = subprocess.run(
-                "nginx -V 2>&1 | grep http_dav_module",
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True
-            )
-            if result.stdout.strip() == "":
+            if not get_build_info().has_module("http_dav_module"):
                 return {
                     "id": self.id,
                     "status": "PASS",
@@ -27,7 +23,8 @@ class control_2_1_2:
                 return {
                     "id": self.id,
                     "status": "FAIL",
-                    "output": "http_dav_module detected"
+                    "output": "http_dav_module detected",
+                    "findings": [Finding(self.id, "nginx", expected="not compiled", actual="http_dav_module")]
                 }
         except FileNotFoundError:
             return {
@@ -39,26 +36,20 @@ class control_2_1_2:
     def remediate(self):
         """Remediation: recompile nginx without http_dav_module"""
         try:
-            version = "1.26.1"
-            url = f"http://nginx.org/download/nginx-{version}.tar.gz"
-            commands = [
-                "dnf install -y gcc make wget tar zlib-devel pcre-devel openssl-devel",
-                f"wget {url} -O /tmp/nginx.tar.gz",
-                "cd /tmp && tar -xvf nginx.tar.gz",
-                f"cd /tmp/nginx-{version} && ./configure --with-http_ssl_module --without-http_dav_module",
-                f"cd /tmp/nginx-{version} && make",
-                f"cd /tmp/nginx-{version} && make install"
-            ]
-
-            for cmd in commands:
-                subprocess.run(cmd, shell=True, check=True)
-
+            # una sola compilacion compartida con 1.1.2, 2.1.2 y 2.1.3
+            build = request_build(self.id, ["--without-http_dav_module"])
+            if build is None:
+                return {
+                    "id": self.id,
+                    "status": "PLANNED",
+                    "output": "Queued for the shared NGINX build (without http_dav_module)"
+                }
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
-                "output": f"NGINX {version} recompiled without http_dav_module"
+                "output": f"NGINX {NGINX_VERSION} recompiled without http_dav_module"
             }
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, OSError) as e:
             return {
                 "id": self.id,
                 "status": "ERROR",
@@ -68,7 +59,7 @@ class control_2_1_2:
     def report(self):
         """Generate a JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,23 +1,21 @@
 import subprocess
-import json
+from findings import Finding, dumps
+from build_planner import NGINX_VERSION, request_build
+from nginx_build import get_build_info
 
 class control_2_1_3:
     def __init__(self):
         self.id = "2.1.3"
         self.title = "Ensure modules with gzip functionality are disabled"
         self.description = "Verify that http_gzip_module and http_gzip_static_module are not compiled into NGINX."
+        self.inputs = ["nginx"]
 
     def check(self):
         """Audit: verify gzip modules are not present"""
         try:
-            result = subprocess.run(
-                "nginx -V 2>&1 | grep -E '(http_gzip_module|http_gzip_static_module)'",
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True
-            )
-            if result.stdout.strip() == "":
+            info = get_build_info()
+            detected = [m for m in ("http_gzip_module", "http_gzip_static_module") if info.has_module(m)]
+            if not detected:
                 return {
                     "id": self.id,
                     "status": "PASS",
@@ -27,7 +25,8 @@ class control_2_1_3:
                 return {
                     "id": self.id,
                     "status": "FAIL",
-                    "output": f"Gzip modules detected:\n{result.stdout.strip()}"
+                    "output": "Gzip modules detected",
+                    "findings": [Finding(self.id, "nginx", expected="not compiled", actual=m) for m in detected]
                 }
         except FileNotFoundError:
             return {
@@ -39,26 +38,20 @@ class control_2_1_3:
     def remediate(self):
         """Remediation: recompile nginx without gzip modules"""
         try:
-            version = "1.26.1"
-            url = f"http://nginx.org/download/nginx-{version}.tar.gz"
-            commands = [
-                "dnf install -y gcc make wget tar zlib-devel pcre-devel openssl-devel",
-                f"wget {url} -O /tmp/nginx.tar.gz",
-                "cd /tmp && tar -xvf nginx.tar.gz",
-                f"cd /tmp/nginx-{version} && ./configure --with-http_ssl_module --without-http_gzip_module --without-http_gzip_static_module",
-                f"cd /tmp/nginx-{version} && make",
-                f"cd /tmp/nginx-{version} && make install"
-            ]
-
-            for cmd in commands:
-                subprocess.run(cmd, shell=True, check=True)
-
+            # una sola compilacion compartida con 1.1.2, 2.1.2 y 2.1.3
+            build = request_build(self.id, ["--without-http_gzip_module", "--without-http_gzip_static_module"])
+            if build is None:
+                return {
+                    "id": self.id,
+                    "status": "PLANNED",
+                    "output": "Queued for the shared NGINX build (without gzip modules)"
+                }
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
-                "output": f"NGINX {version} recompiled without gzip modules"
+                "output": f"NGINX {NGINX_VERSION} recompiled without gzip modules"
             }
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, OSError) as e:
             return {
                 "id": self.id,
                 "status": "ERROR",
@@ -68,7 +61,7 @@ class control_2_1_3:
     def report(self):
         """Generate a JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,33 +1,39 @@
-import subprocess
-import json
-import glob
+from findings import Finding, dumps
+from nginx_config import CONFIG_FILES, get_config
+from remediation import config_transaction, set_directive
 
 class control_2_1_4:
     def __init__(self):
         self.id = "2.1.4"
         self.title = "Ensure the autoindex module is disabled"
         self.description = "Verify that the autoindex directive is not set to 'on' in NGINX configuration files."
+        self.inputs = [CONFIG_FILES]
 
     def check(self):
-        """Audit: search nginx.conf and conf.d/* for autoindex directives"""
+        """Audit: search the parsed configuration for autoindex directives"""
+        unloaded = get_config().load_findings(self.id)
+        if unloaded:
+            # con parte de la configuracion sin cargar no se puede dar un PASS
+            return {
+                "id": self.id,
+                "status": "ERROR",
+                "output": "NGINX configuration only partly loaded",
+                "findings": unloaded
+            }
         try:
-            findings = []
-            files = ["/etc/nginx/nginx.conf"] + glob.glob("/etc/nginx/conf.d/*.conf")
-
-            for f in files:
-                try:
-                    with open(f, "r") as conf:
-                        for line in conf:
-                            if "autoindex" in line.lower():
-                                findings.append(f"{f}: {line.strip()}")
-                except FileNotFoundError:
-                    continue
+            config = get_config()
+            directives = config.find("autoindex")
+            findings = [
+                Finding.from_directive(self.id, d, expected="autoindex off")
+                for d in directives if (d.value() or "").lower() == "on"
+            ]
 
-            if any("autoindex on" in entry.lower() for entry in findings):
+            if findings:
                 return {
                     "id": self.id,
                     "status": "FAIL",
-                    "output": "\n".join(findings)
+                    "output": "autoindex enabled in the configuration",
+                    "findings": findings
                 }
             else:
                 return {
@@ -45,31 +51,26 @@ class control_2_1_4:
     def remediate(self):
         """Remediation: disable autoindex by replacing 'autoindex on' with 'autoindex off'"""
         try:
-            files = ["/etc/nginx/nginx.conf"] + glob.glob("/etc/nginx/conf.d/*.conf")
             changes = []
+            unchanged = []
 
-            for f in files:
-                try:
-                    with open(f, "r") as conf:
-                        lines = conf.readlines()
-                    new_lines = []
-                    modified = False
-                    for line in lines:
-                        if "autoindex on" in line.lower():
-                            new_lines.append("    autoindex off;\n")
-                            modified = True
-                            changes.append(f"Modified {f}: {line.strip()} -> autoindex off;")
-                        else:
-                            new_lines.append(line)
-                    if modified:
-                        with open(f, "w") as conf:
-                            conf.writelines(new_lines)
-                except FileNotFoundError:
-                    continue
-
-            # Recargar configuración de NGINX
-            subprocess.run("systemctl reload nginx", shell=True, check=False)
+            # nginx -t + recarga una sola vez al cerrar la transaccion
+            with config_transaction():
+                for d in get_config().find("autoindex"):
+                    if (d.value() or "").lower() != "on":
+                        continue
+                    if set_directive(d, "off"):
+                        changes.append(f"Modified {d.where()}: {d.text()} -> autoindex off;")
+                    else:
+                        unchanged.append(d.where())
 
+            if unchanged:
+                # p.ej. directiva partida en varias lineas: hay que editarla a mano
+                return {
+                    "id": self.id,
+                    "status": "ERROR",
+                    "output": "\n".join(changes + [f"Not changed (edit by hand): {where}" for where in unchanged])
+                }
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
@@ -85,7 +86,7 @@ class control_2_1_4:
     def report(self):
         """Generate a JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,61 +1,80 @@
 import subprocess
-import json
+from findings import Finding, dumps
+from profiling import run_command
 import pwd
 import grp
+from nginx_config import CONFIG_FILES, NGINX_CONF, get_config
+from remediation import RemediationError, config_transaction, set_directive, add_directive
+from identity import GROUP, PASSWD, ROOT_UID, user_entry, user_group_ids, group_name, forget_user
 
 class control_2_2_1:
     def __init__(self):
         self.id = "2.2.1"
         self.title = "Ensure NGINX is run using a non-privileged, dedicated service account"
         self.description = "Verify that NGINX worker processes run under a dedicated non-privileged user."
+        self.inputs = [CONFIG_FILES, PASSWD, GROUP]
 
     def check(self):
         """Audit: verify nginx runs as a non-privileged, dedicated user"""
         findings = []
 
         # 1. Revisar nginx.conf para encontrar directiva user
-        try:
-            with open("/etc/nginx/nginx.conf", "r") as conf:
-                lines = conf.readlines()
-                user_line = [line.strip() for line in lines if line.strip().startswith("user")]
-                if user_line:
-                    user_directive = user_line[0].split()[1].replace(";", "")
-                    findings.append(f"User directive in nginx.conf: {user_directive}")
-                else:
-                    return {
-                        "id": self.id,
-                        "status": "FAIL",
-                        "output": "No user directive found in /etc/nginx/nginx.conf"
-                    }
-        except FileNotFoundError:
+        config = get_config()
+        if NGINX_CONF in config.errors:
+            return {
+                "id": self.id,
+                "status": "ERROR",
+                "output": f"{NGINX_CONF} not found"
+            }
+        unloaded = config.load_findings(self.id)
+        if unloaded:
+            # con parte de la configuracion sin cargar no se puede dar un PASS
             return {
                 "id": self.id,
                 "status": "ERROR",
-                "output": "/etc/nginx/nginx.conf not found"
+                "output": "NGINX configuration only partly loaded",
+                "findings": unloaded
+            }
+        user = config.first("user")
+        if user is not None and user.value():
+            user_directive = user.value()
+            findings.append(f"User directive in nginx.conf: {user_directive}")
+        else:
+            return {
+                "id": self.id,
+                "status": "FAIL",
+                "output": f"No user directive found in {NGINX_CONF}",
+                "findings": [Finding(self.id, NGINX_CONF, expected="user <dedicated account>", actual="no user directive")]
             }
 
         # 2. Verificar que el usuario exista
-        try:
-            user_info = pwd.getpwnam(user_directive)
-            findings.append(f"User {user_directive} exists with UID {user_info.pw_uid}")
-            if user_info.pw_uid == 0:
-                return {
-                    "id": self.id,
-                    "status": "FAIL",
-                    "output": f"User {user_directive} is privileged (UID 0)"
-                }
-        except KeyError:
+        user_info = user_entry(user_directive)
+        if user_info is None:
+            return {
+                "id": self.id,
+                "status": "FAIL",
+                "output": f"User {user_directive} not found in system",
+                "findings": [Finding.from_directive(self.id, user, expected="existing account", message="account missing")]
+            }
+        findings.append(f"User {user_directive} exists with UID {user_info.pw_uid}")
+        if user_info.pw_uid == ROOT_UID:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": f"User {user_directive} not found in system"
+                "output": f"User {user_directive} is privileged (UID 0)",
+                "findings": [Finding(self.id, user_directive, expected="non-zero UID", actual="UID 0", severity="high")]
             }
 
         # 3. Verificar grupos
-        groups = [g.gr_name for g in grp.getgrall() if user_directive in g.gr_mem or g.gr_gid == user_info.pw_gid]
+        groups = sorted(group_name(gid) for gid in user_group_ids(user_directive))
         if len(groups) > 1:
             findings.append(f"User {user_directive} belongs to multiple groups: {', '.join(groups)}")
-            return {"id": self.id, "status": "FAIL", "output": "\n".join(findings)}
+            return {
+                "id": self.id,
+                "status": "FAIL",
+                "output": "\n".join(findings),
+                "findings": [Finding(self.id, user_directive, expected="one group", actual=", ".join(groups))]
+            }
         else:
             findings.append(f"User {user_directive} only belongs to group {groups[0]}")
 
@@ -63,51 +82,44 @@ class control_2_2_1:
 
     def remediate(self):
         """Remediation: create dedicated nginx user and update nginx.conf"""
+        account = "Dedicated user 'nginx' already exists"
         try:
             # Crear grupo nginx si no existe
             try:
                 grp.getgrnam("nginx")
             except KeyError:
-                subprocess.run("groupadd nginx", shell=True, check=True)
+                run_command("groupadd nginx", shell=True, check=True)
 
             # Crear usuario nginx si no existe
             try:
                 pwd.getpwnam("nginx")
             except KeyError:
-                subprocess.run("useradd nginx -r -g nginx -d /var/cache/nginx -s /sbin/nologin", shell=True, check=True)
-
-            # Modificar nginx.conf para usar "user nginx;"
-            updated = False
-            conf_file = "/etc/nginx/nginx.conf"
-            with open(conf_file, "r") as conf:
-                lines = conf.readlines()
-            new_lines = []
-            for line in lines:
-                if line.strip().startswith("user"):
-                    new_lines.append("user nginx;\n")
-                    updated = True
-                else:
-                    new_lines.append(line)
-            if not updated:
-                new_lines.insert(0, "user nginx;\n")
-            with open(conf_file, "w") as conf:
-                conf.writelines(new_lines)
+                run_command("useradd nginx -r -g nginx -d /var/cache/nginx -s /sbin/nologin", shell=True, check=True)
+                account = "Dedicated user 'nginx' created"
+            forget_user("nginx")
 
-            # Recargar NGINX
-            subprocess.run("systemctl reload nginx", shell=True, check=False)
+            # Modificar nginx.conf para usar "user nginx;" (valida y recarga NGINX)
+            with config_transaction():
+                user = get_config().first("user")
+                if user is None or not set_directive(user, "nginx"):
+                    add_directive(NGINX_CONF, "user nginx;")
 
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
-                "output": "Dedicated user 'nginx' created and nginx.conf updated"
+                "output": f"{account} and nginx.conf updated",
+                # la cuenta no forma parte de la transaccion: si el lote se deshace, sigue creada
+                "rolled_back_output": f"{account} (not rolled back); the nginx.conf edit was reverted"
             }
         except subprocess.CalledProcessError as e:
             return {"id": self.id, "status": "ERROR", "output": str(e)}
+        except RemediationError as e:
+            return {"id": self.id, "status": "ERROR", "output": f"{account}, but the nginx.conf edit was not applied: {e}"}
 
     def report(self):
         """Generate JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
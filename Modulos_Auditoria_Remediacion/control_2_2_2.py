@@ -1,43 +1,68 @@
 import subprocess
-import json
-import pwd
+from findings import Finding, dumps
+from profiling import run_command
+from identity import SHADOW, forget_shadow, shadow_entry
+from nginx_config import CONFIG_FILES, NGINX_CONF, get_config
+from transport import get_transport
 
 class control_2_2_2:
     def __init__(self):
         self.id = "2.2.2"
         self.title = "Ensure the NGINX service account is locked"
         self.description = "Verify that the nginx service account is locked to prevent direct logins."
+        self.inputs = [CONFIG_FILES, SHADOW]
 
     def get_nginx_user(self):
         """Leer el usuario definido en nginx.conf"""
-        try:
-            with open("/etc/nginx/nginx.conf", "r") as conf:
-                for line in conf:
-                    if line.strip().startswith("user"):
-                        parts = line.strip().split()
-                        if len(parts) >= 2:
-                            return parts[1].replace(";", "")
-        except FileNotFoundError:
-            return None
-        return None
+        user = get_config().first("user")
+        return user.value() if user is not None else None
 
     def check(self):
         """Audit: verify that the nginx user account is locked"""
+        unloaded = get_config().load_findings(self.id)
+        if unloaded:
+            # con parte de la configuracion sin cargar no se puede dar un PASS
+            return {
+                "id": self.id,
+                "status": "ERROR",
+                "output": "NGINX configuration only partly loaded",
+                "findings": unloaded
+            }
         nginx_user = self.get_nginx_user()
         if not nginx_user:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "No user directive found in /etc/nginx/nginx.conf"
+                "output": f"No user directive found in {NGINX_CONF}",
+                "findings": [Finding(self.id, NGINX_CONF, expected="user <dedicated account>", actual="no user directive")]
+            }
+
+        # /etc/shadow leido una sola vez por host; sin permisos se usa passwd -S
+        entry = shadow_entry(nginx_user)
+        if entry is None:
+            return {
+                "id": self.id,
+                "status": "FAIL",
+                "output": f"User {nginx_user} has no entry in {SHADOW}",
+                "findings": [Finding(self.id, SHADOW, expected=f"{nginx_user} locked", actual="no entry")]
             }
+        if entry is not False:
+            if entry.locked:
+                return {
+                    "id": self.id,
+                    "status": "PASS",
+                    "output": f"{nginx_user} {entry.status} (password field starts with '{entry.marker}')"
+                }
+            else:
+                return {
+                    "id": self.id,
+                    "status": "FAIL",
+                    "output": f"User {nginx_user} is not locked:\n{nginx_user} {entry.status}",
+                    "findings": [Finding(self.id, nginx_user, expected="LK", actual=entry.status)]
+                }
 
         try:
-            result = subprocess.run(
-                ["passwd", "-S", nginx_user],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
+            result = get_transport().run(["passwd", "-S", nginx_user])
             if result.returncode == 0:
                 if "LK" in result.stdout:
                     return {
@@ -49,7 +74,8 @@ class control_2_2_2:
                     return {
                         "id": self.id,
                         "status": "FAIL",
-                        "output": f"User {nginx_user} is not locked:\n{result.stdout.strip()}"
+                        "output": f"User {nginx_user} is not locked:\n{result.stdout.strip()}",
+                        "findings": [Finding(self.id, nginx_user, expected="LK", actual=result.stdout.strip())]
                     }
             else:
                 return {
@@ -74,7 +100,8 @@ class control_2_2_2:
                 "output": "No nginx user found to lock"
             }
         try:
-            subprocess.run(f"passwd -l {nginx_user}", shell=True, check=True)
+            run_command(f"passwd -l {nginx_user}", shell=True, check=True)
+            forget_shadow()
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
@@ -90,7 +117,7 @@ class control_2_2_2:
     def report(self):
         """Generate JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,56 +1,63 @@
 import subprocess
-import json
-import pwd
+from findings import Finding, dumps
+from profiling import run_command
+from nginx_config import CONFIG_FILES, NGINX_CONF, get_config
+from identity import PASSWD, forget_user, user_entry
 
 class control_2_2_3:
     def __init__(self):
         self.id = "2.2.3"
         self.title = "Ensure the NGINX service account has an invalid shell"
         self.description = "Verify that the nginx service account cannot log in by ensuring its shell is /sbin/nologin."
+        self.inputs = [CONFIG_FILES, PASSWD]
 
     def get_nginx_user(self):
         """Leer el usuario definido en nginx.conf"""
-        try:
-            with open("/etc/nginx/nginx.conf", "r") as conf:
-                for line in conf:
-                    if line.strip().startswith("user"):
-                        parts = line.strip().split()
-                        if len(parts) >= 2:
-                            return parts[1].replace(";", "")
-        except FileNotFoundError:
-            return None
-        return None
+        user = get_config().first("user")
+        return user.value() if user is not None else None
 
     def check(self):
         """Audit: verify that the nginx user has /sbin/nologin as shell"""
+        unloaded = get_config().load_findings(self.id)
+        if unloaded:
+            # con parte de la configuracion sin cargar no se puede dar un PASS
+            return {
+                "id": self.id,
+                "status": "ERROR",
+                "output": "NGINX configuration only partly loaded",
+                "findings": unloaded
+            }
         nginx_user = self.get_nginx_user()
         if not nginx_user:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "No user directive found in /etc/nginx/nginx.conf"
+                "output": f"No user directive found in {NGINX_CONF}",
+                "findings": [Finding(self.id, NGINX_CONF, expected="user <dedicated account>", actual="no user directive")]
             }
 
-        try:
-            user_info = pwd.getpwnam(nginx_user)
-            shell = user_info.pw_shell
-            if "nologin" in shell:
-                return {
-                    "id": self.id,
-                    "status": "PASS",
-                    "output": f"User {nginx_user} has invalid shell: {shell}"
-                }
-            else:
-                return {
-                    "id": self.id,
-                    "status": "FAIL",
-                    "output": f"User {nginx_user} has a valid shell: {shell}"
-                }
-        except KeyError:
+        user_info = user_entry(nginx_user)
+        if user_info is None:
+            return {
+                "id": self.id,
+                "status": "FAIL",
+                "output": f"User {nginx_user} not found in system",
+                "findings": [Finding(self.id, PASSWD, expected=f"{nginx_user} with /sbin/nologin", actual="no entry")]
+            }
+
+        shell = user_info.pw_shell
+        if "nologin" in shell:
+            return {
+                "id": self.id,
+                "status": "PASS",
+                "output": f"User {nginx_user} has invalid shell: {shell}"
+            }
+        else:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": f"User {nginx_user} not found in system"
+                "output": f"User {nginx_user} has a valid shell: {shell}",
+                "findings": [Finding(self.id, nginx_user, expected="/sbin/nologin", actual=shell)]
             }
 
     def remediate(self):
@@ -63,7 +70,8 @@ class control_2_2_3:
                 "output": "No nginx user found to remediate"
             }
         try:
-            subprocess.run(f"usermod -s /sbin/nologin {nginx_user}", shell=True, check=True)
+            run_command(f"usermod -s /sbin/nologin {nginx_user}", shell=True, check=True)
+            forget_user(nginx_user)
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
@@ -79,7 +87,7 @@ class control_2_2_3:
     def report(self):
         """Generate JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,60 +1,61 @@
-import os
-import pwd
-import grp
 import subprocess
-import json
+from findings import Finding, dumps
+from profiling import run_command
+from fs_scan import NGINX_DIR, get_snapshot, reset_snapshot
+from identity import GROUP, PASSWD, ROOT_UID, ROOT_GID, owner_text
 
 class control_2_3_1:
     def __init__(self):
         self.id = "2.3.1"
         self.title = "Ensure NGINX directories and files are owned by root"
         self.description = "Verify that /etc/nginx and its files are owned by root:root."
+        self.inputs = [NGINX_DIR, PASSWD, GROUP]
 
     def check(self):
         """Audit: verify ownership of /etc/nginx and its contents"""
-        path = "/etc/nginx"
         findings = []
+        snapshot = get_snapshot()
 
-        if not os.path.exists(path):
+        if not snapshot.exists:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "/etc/nginx does not exist"
+                "output": f"{NGINX_DIR} does not exist",
+                "findings": [Finding(self.id, NGINX_DIR, expected="root:root", actual="missing", severity="high")]
             }
 
-        for root, dirs, files in os.walk(path):
-            for name in [*dirs, *files]:
-                fpath = os.path.join(root, name)
-                try:
-                    st = os.stat(fpath)
-                    owner = pwd.getpwuid(st.st_uid).pw_name
-                    group = grp.getgrgid(st.st_gid).gr_name
-                    if owner != "root" or group != "root":
-                        findings.append(f"{fpath} owned by {owner}:{group}")
-                except Exception as e:
-                    findings.append(f"Error checking {fpath}: {e}")
+        for entry in snapshot.entries:
+            if entry.error:
+                findings.append(Finding(self.id, entry.path, actual=entry.error, message="cannot check"))
+                continue
+            # root es uid/gid 0: solo se resuelven nombres para los hallazgos
+            if entry.uid != ROOT_UID or entry.gid != ROOT_GID:
+                findings.append(Finding(self.id, entry.path, expected="root:root", actual=owner_text(entry.uid, entry.gid),
+                                        severity="high", message="owner"))
 
         if findings:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "Non-root ownership found:\n" + "\n".join(findings)
+                "output": f"Non-root ownership found on {len(findings)} entries",
+                "findings": findings
             }
         else:
             return {
                 "id": self.id,
                 "status": "PASS",
-                "output": "All files in /etc/nginx are owned by root:root"
+                "output": f"All files in {NGINX_DIR} are owned by root:root"
             }
 
     def remediate(self):
         """Remediation: set ownership of /etc/nginx to root:root"""
         try:
-            subprocess.run("chown -R root:root /etc/nginx", shell=True, check=True)
+            run_command(f"chown -R root:root {NGINX_DIR}", shell=True, check=True)
+            reset_snapshot()
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
-                "output": "Ownership of /etc/nginx set to root:root"
+                "output": f"Ownership of {NGINX_DIR} set to root:root"
             }
         except subprocess.CalledProcessError as e:
             return {
@@ -66,7 +67,7 @@ class control_2_3_1:
     def report(self):
         """Generate JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
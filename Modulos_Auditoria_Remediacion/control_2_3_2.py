@@ -1,46 +1,47 @@
-import os
-import stat
 import subprocess
-import json
+from findings import Finding, dumps
+from profiling import run_command
+from fs_scan import NGINX_DIR, get_snapshot, reset_snapshot
 
 class control_2_3_2:
     def __init__(self):
         self.id = "2.3.2"
         self.title = "Ensure access to NGINX directories and files is restricted"
         self.description = "Verify that NGINX directories and files in /etc/nginx follow least privilege principle."
+        self.inputs = [NGINX_DIR]
 
     def check(self):
         """Audit: verify directory and file permissions"""
-        base_path = "/etc/nginx"
         findings = []
+        snapshot = get_snapshot()
 
-        if not os.path.exists(base_path):
+        if not snapshot.exists:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "/etc/nginx does not exist"
+                "output": f"{NGINX_DIR} does not exist",
+                "findings": [Finding(self.id, NGINX_DIR, expected="0o755", actual="missing", severity="high")]
             }
 
-        # Revisar directorios
-        for root, dirs, files in os.walk(base_path):
-            for d in dirs:
-                dpath = os.path.join(root, d)
-                mode = stat.S_IMODE(os.stat(dpath).st_mode)
-                if mode > 0o755:
-                    findings.append(f"Directory {dpath} has insecure permissions: {oct(mode)}")
-
+        for entry in snapshot.entries:
+            if entry.error:
+                continue
+            # Revisar directorios
+            if entry.is_dir:
+                if entry.mode > 0o755:
+                    findings.append(Finding(self.id, entry.path, expected="0o755", actual=oct(entry.mode),
+                                            severity="high", message="directory permissions"))
             # Revisar archivos
-            for f in files:
-                fpath = os.path.join(root, f)
-                mode = stat.S_IMODE(os.stat(fpath).st_mode)
-                if mode > 0o660:
-                    findings.append(f"File {fpath} has insecure permissions: {oct(mode)}")
+            elif entry.mode > 0o660:
+                findings.append(Finding(self.id, entry.path, expected="0o660", actual=oct(entry.mode),
+                                        severity="high", message="file permissions"))
 
         if findings:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "\n".join(findings)
+                "output": f"Insecure permissions found on {len(findings)} entries",
+                "findings": findings
             }
         else:
             return {
@@ -52,12 +53,13 @@ class control_2_3_2:
     def remediate(self):
         """Remediation: fix permissions for directories and files"""
         try:
-            subprocess.run("find /etc/nginx -type d -exec chmod go-w {} +", shell=True, check=True)
-            subprocess.run("find /etc/nginx -type f -exec chmod ug-x,o-rwx {} +", shell=True, check=True)
+            run_command(f"find {NGINX_DIR} -type d -exec chmod go-w {{}} +", shell=True, check=True)
+            run_command(f"find {NGINX_DIR} -type f -exec chmod ug-x,o-rwx {{}} +", shell=True, check=True)
+            reset_snapshot()
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
-                "output": "Permissions for /etc/nginx directories and files adjusted"
+                "output": f"Permissions for {NGINX_DIR} directories and files adjusted"
             }
         except subprocess.CalledProcessError as e:
             return {
@@ -69,7 +71,7 @@ class control_2_3_2:
     def report(self):
         """Generate JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,44 +1,47 @@
-import os
-import stat
-import pwd
-import grp
 import subprocess
-import json
+from findings import Finding, dumps
+from profiling import run_command
+from fs_scan import lookup
+from identity import GROUP, PASSWD, ROOT_UID, ROOT_GID, owner_text
+from nginx_config import PID_FILE
+from transport import get_transport
 
 class control_2_3_3:
     def __init__(self):
         self.id = "2.3.3"
         self.title = "Ensure the NGINX process ID (PID) file is secured"
         self.description = "Verify that /var/run/nginx.pid is owned by root:root and has permissions 644."
+        self.inputs = [PID_FILE, PASSWD, GROUP]
 
     def check(self):
         """Audit: verify ownership and permissions of nginx.pid"""
-        pid_file = "/var/run/nginx.pid"
+        pid_file = PID_FILE
+        entry = lookup(pid_file)
 
-        if not os.path.exists(pid_file):
+        if entry is None:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": f"{pid_file} does not exist"
+                "output": f"{pid_file} does not exist",
+                "findings": [Finding(self.id, pid_file, expected="root:root 0o644", actual="missing")]
             }
 
         try:
-            st = os.stat(pid_file)
-            owner = pwd.getpwuid(st.st_uid).pw_name
-            group = grp.getgrgid(st.st_gid).gr_name
-            mode = stat.S_IMODE(st.st_mode)
+            mode = entry.mode
 
             findings = []
-            if owner != "root" or group != "root":
-                findings.append(f"Owner/Group is {owner}:{group}, expected root:root")
+            if entry.uid != ROOT_UID or entry.gid != ROOT_GID:
+                findings.append(Finding(self.id, pid_file, expected="root:root", actual=owner_text(entry.uid, entry.gid),
+                                        message="owner"))
             if mode != 0o644:
-                findings.append(f"Permissions are {oct(mode)}, expected 0o644")
+                findings.append(Finding(self.id, pid_file, expected="0o644", actual=oct(mode), message="permissions"))
 
             if findings:
                 return {
                     "id": self.id,
                     "status": "FAIL",
-                    "output": "\n".join(findings)
+                    "output": f"{pid_file} is not properly secured",
+                    "findings": findings
                 }
             else:
                 return {
@@ -56,16 +59,16 @@ class control_2_3_3:
 
     def remediate(self):
         """Remediation: set correct owner and permissions for nginx.pid"""
-        pid_file = "/var/run/nginx.pid"
-        if not os.path.exists(pid_file):
+        pid_file = PID_FILE
+        if not get_transport().exists(pid_file):
             return {
                 "id": self.id,
                 "status": "ERROR",
                 "output": f"{pid_file} not found"
             }
         try:
-            subprocess.run(f"chown root:root {pid_file}", shell=True, check=True)
-            subprocess.run(f"chmod 644 {pid_file}", shell=True, check=True)
+            run_command(f"chown root:root {pid_file}", shell=True, check=True)
+            run_command(f"chmod 644 {pid_file}", shell=True, check=True)
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
@@ -81,7 +84,7 @@ class control_2_3_3:
     def report(self):
         """Generate JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,30 +1,35 @@
 import os
-import stat
 import pwd
 import grp
-import json
+from findings import Finding, dumps
+from nginx_config import get_config
+from fs_scan import lookup
+from identity import ROOT_UID, user_name, group_name, group_id
+from transport import get_transport
 
 class control_2_3_4:
     def __init__(self):
         self.id = "2.3.4"
         self.title = "Ensure the core dump directory is secured"
         self.description = "Verify that the working_directory directive is properly secured."
+        self.inputs = None  # el directorio depende de working_directory
 
     def get_working_directory(self):
         """Buscar la directiva working_directory en nginx.conf"""
-        try:
-            with open("/etc/nginx/nginx.conf", "r") as conf:
-                for line in conf:
-                    if "working_directory" in line and not line.strip().startswith("#"):
-                        parts = line.strip().split()
-                        if len(parts) >= 2:
-                            return parts[1].replace(";", "")
-        except FileNotFoundError:
-            return None
-        return None
+        wdir = get_config().first("working_directory")
+        return wdir.value() if wdir is not None else None
 
     def check(self):
         """Audit: verificar el directorio de working_directory"""
+        unloaded = get_config().load_findings(self.id)
+        if unloaded:
+            # con parte de la configuracion sin cargar no se puede dar un PASS
+            return {
+                "id": self.id,
+                "status": "ERROR",
+                "output": "NGINX configuration only partly loaded",
+                "findings": unloaded
+            }
         wdir = self.get_working_directory()
         if not wdir:
             return {
@@ -33,31 +38,31 @@ class control_2_3_4:
                 "output": "No working_directory directive found (default: disabled)"
             }
 
-        if not os.path.exists(wdir):
+        entry = lookup(wdir)
+        if entry is None:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": f"Configured working_directory {wdir} does not exist"
+                "output": f"Configured working_directory {wdir} does not exist",
+                "findings": [Finding(self.id, wdir, expected="root:nginx, no access for others", actual="missing")]
             }
 
-        st = os.stat(wdir)
-        owner = pwd.getpwuid(st.st_uid).pw_name
-        group = grp.getgrgid(st.st_gid).gr_name
-        mode = stat.S_IMODE(st.st_mode)
+        mode = entry.mode
 
         findings = []
-        if owner != "root":
-            findings.append(f"Owner is {owner}, expected root")
-        if group != "nginx":
-            findings.append(f"Group is {group}, expected nginx")
+        if entry.uid != ROOT_UID:
+            findings.append(Finding(self.id, wdir, expected="root", actual=user_name(entry.uid), message="owner"))
+        if entry.gid != group_id("nginx"):
+            findings.append(Finding(self.id, wdir, expected="nginx", actual=group_name(entry.gid), message="group"))
         if mode & 0o007:  # permisos para others
-            findings.append(f"Directory {wdir} has others permissions: {oct(mode)}")
+            findings.append(Finding(self.id, wdir, expected="no access for others", actual=oct(mode), message="permissions"))
 
         if findings:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "\n".join(findings)
+                "output": f"working_directory {wdir} is not properly secured",
+                "findings": findings
             }
         else:
             return {
@@ -75,7 +80,7 @@ class control_2_3_4:
                 "status": "INFO",
                 "output": "No working_directory directive found (nothing to remediate)"
             }
-        if not os.path.exists(wdir):
+        if not get_transport().exists(wdir):
             return {
                 "id": self.id,
                 "status": "ERROR",
@@ -100,7 +105,7 @@ class control_2_3_4:
     def report(self):
         """Generar reporte en JSON"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
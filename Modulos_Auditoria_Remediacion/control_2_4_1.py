@@ -1,43 +1,59 @@
-import os
 import re
-import glob
-import json
+from findings import Finding, dumps
+from nginx_config import CONFIG_FILES, get_config
 
 class control_2_4_1:
     def __init__(self, authorized_ports=None):
         self.id = "2.4.1"
         self.title = "Ensure NGINX only listens for network connections on authorized ports"
         self.description = "Verify that NGINX is only listening on authorized ports."
+        self.inputs = [CONFIG_FILES]
         self.authorized_ports = authorized_ports if authorized_ports else [80, 443]
 
     def find_listen_directives(self):
         """Buscar todas las directivas listen en la configuración"""
-        files = ["/etc/nginx/nginx.conf"] + glob.glob("/etc/nginx/conf.d/*.conf")
         directives = []
-        for f in files:
-            if not os.path.exists(f):
-                continue
-            try:
-                with open(f, "r") as conf:
-                    for line in conf:
-                        match = re.search(r"listen\s+(\d+)", line)
-                        if match:
-                            port = int(match.group(1))
-                            directives.append((f, line.strip(), port))
-            except Exception:
-                continue
+        for d in get_config().find("listen"):
+            port = self.listen_port(d.value() or "")
+            if port is not None:
+                directives.append((d, port))
         return directives
 
+    @staticmethod
+    def listen_port(address):
+        """Puerto de un argumento de listen (80, 127.0.0.1:8080, [::]:443, unix:...)"""
+        if address.startswith("unix:"):
+            return None
+        match = re.search(r"(?:^|:)(\d+)$", address)
+        if match:
+            return int(match.group(1))
+        # solo direccion: nginx escucha en el puerto 80
+        return 80
+
     def check(self):
         """Audit: verificar que solo se escuchen puertos autorizados"""
+        unloaded = get_config().load_findings(self.id)
+        if unloaded:
+            # con parte de la configuracion sin cargar no se puede dar un PASS
+            return {
+                "id": self.id,
+                "status": "ERROR",
+                "output": "NGINX configuration only partly loaded",
+                "findings": unloaded
+            }
         directives = self.find_listen_directives()
-        unauthorized = [f"{f}: {line}" for f, line, port in directives if port not in self.authorized_ports]
+        expected = "port in " + ", ".join(map(str, self.authorized_ports))
+        unauthorized = [
+            Finding.from_directive(self.id, d, expected=expected)
+            for d, port in directives if port not in self.authorized_ports
+        ]
 
         if unauthorized:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "Found unauthorized listening ports:\n" + "\n".join(unauthorized)
+                "output": "Found unauthorized listening ports",
+                "findings": unauthorized
             }
         else:
             return {
@@ -57,7 +73,7 @@ class control_2_4_1:
     def report(self):
         """Generate JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,58 +1,95 @@
-import subprocess
-import json
-import re
-import glob
-import os
+from findings import Finding, dumps
+from http_probe import Target, listen_targets, probe_all
+from nginx_config import get_config
+from transport import get_transport
 
 class control_2_4_2:
     def __init__(self):
         self.id = "2.4.2"
         self.title = "Ensure requests for unknown host names are rejected"
         self.description = "Verify that NGINX rejects requests with invalid Host headers."
+        self.inputs = None  # prueba en vivo contra el servidor
 
     def check(self):
-        """Audit: send curl request with invalid Host header"""
-        try:
-            result = subprocess.run(
-                ["curl", "-k", "-o", "/dev/null", "-s", "-w", "%{http_code}", "https://127.0.0.1", "-H", "Host: invalid.host.com"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            status_code = result.stdout.strip()
-        except FileNotFoundError:
+        """Audit: probe every listen address with invalid Host headers"""
+        if not get_transport().live:
+            return {
+                "id": self.id,
+                "status": "INFO",
+                "output": "Live probe skipped: the audited root is not a running system"
+            }
+        config = get_config()
+        unloaded = config.load_findings(self.id)
+        if unloaded:
+            # con parte de la configuracion sin cargar no se puede dar un PASS
             return {
                 "id": self.id,
                 "status": "ERROR",
-                "output": "curl not found"
+                "output": "NGINX configuration only partly loaded",
+                "findings": unloaded
             }
+        targets = listen_targets(config) or [Target("127.0.0.1", 443, tls=True)]
+        probes = probe_all(targets)
+        # solo cuentan las respuestas HTTP reales; sin conexion no se sabe si se rechaza
+        accepted = [p for p in probes if p.answered and not p.rejected]
+        unreachable = [p for p in probes if not p.answered]
+        unreachable_findings = [
+            Finding(self.id, str(p.target), severity="info", actual=f"Host: {p.host_header} -> {p.error}",
+                    message="probe could not connect")
+            for p in unreachable
+        ]
 
-        # Buscar si hay algún bloque server sin server_name
-        files = ["/etc/nginx/nginx.conf"] + glob.glob("/etc/nginx/conf.d/*.conf")
-        missing_server_names = []
-        for f in files:
-            if not os.path.exists(f):
-                continue
-            with open(f, "r") as conf:
-                content = conf.read()
-                blocks = re.findall(r"server\s*{.*?}", content, re.S)
-                for block in blocks:
-                    if "server_name" not in block:
-                        missing_server_names.append(f)
+        # Bloques server (con sus include) sin server_name; el default_server no lo necesita
+        servers = config.scopes("server", parent="http")
+        default_servers = [s.where() for s in servers if self.is_default(s)]
+        missing_server_names = [
+            s for s in servers
+            if s.first("server_name") is None and not self.is_default(s)
+        ]
+        defaults = f"default_server in: {default_servers}." if default_servers else "No default_server defined."
 
-        if status_code.startswith("4") and not missing_server_names:
+        if not accepted and not missing_server_names and unreachable:
+            answered = len(probes) - len(unreachable)
+            return {
+                "id": self.id,
+                "status": "INFO" if answered else "ERROR",
+                "output": f"{answered} requests with invalid Host headers rejected, "
+                          f"{len(unreachable)} could not be sent. {defaults}",
+                "findings": unreachable_findings
+            }
+        if not accepted and not missing_server_names:
             return {
                 "id": self.id,
                 "status": "PASS",
-                "output": f"NGINX returned {status_code} for invalid host. All server blocks define server_name."
+                "output": f"{len(probes)} requests with invalid Host headers rejected. All server blocks define server_name. {defaults}"
             }
         else:
+            findings = [
+                Finding(self.id, str(p.target), expected="4xx or 444", severity="high",
+                        actual=f"Host: {p.host_header} -> {p.status}",
+                        message="invalid Host header not rejected")
+                for p in accepted
+            ]
+            findings += [
+                Finding(self.id, s.block.file, s.block.line, expected="server_name", message="missing server_name")
+                for s in missing_server_names
+            ]
+            findings += unreachable_findings
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": f"NGINX returned {status_code} for invalid host OR missing server_name in: {missing_server_names}"
+                "output": f"Unknown host names are not rejected everywhere. {defaults}",
+                "findings": findings
             }
 
+    @staticmethod
+    def is_default(server):
+        """True if any listen of the server block is marked default_server"""
+        return any(
+            "default_server" in d.args or "default" in d.args
+            for d in server.get("listen")
+        )
+
     def remediate(self):
         """Remediation instructions (manual edit required)"""
         return {
@@ -70,7 +107,7 @@ class control_2_4_2:
     def report(self):
         """Generate JSON report"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
@@ -1,49 +1,67 @@
-import re
-import glob
-import os
-import json
-import subprocess
+from findings import Finding, dumps
+from nginx_config import CONFIG_FILES, DEFAULTS, NGINX_CONF, get_config, parse_time
+from remediation import config_transaction, set_directive, add_directive
 
 class control_2_4_4:
     def __init__(self):
         self.id = "2.4.4"
         self.title = "Ensure send_timeout is set to 10 seconds or less, but not 0"
         self.description = "Verify that send_timeout is configured correctly in nginx.conf."
+        self.inputs = [CONFIG_FILES]
 
     def find_send_timeout(self):
-        """Buscar la directiva send_timeout en archivos de configuración"""
-        files = ["/etc/nginx/nginx.conf"] + glob.glob("/etc/nginx/conf.d/*.conf")
+        """Valor efectivo de send_timeout en cada scope http/server/location (con herencia)"""
         values = []
-        for f in files:
-            if not os.path.exists(f):
+        seen = set()
+        for scope, d in get_config().effective("send_timeout"):
+            # cada directiva (o el valor por defecto) se informa una sola vez
+            if id(d) in seen:
                 continue
-            with open(f, "r") as conf:
-                for line in conf:
-                    match = re.search(r"send_timeout\s+(\d+)", line)
-                    if match:
-                        values.append((f, int(match.group(1)), line.strip()))
+            seen.add(id(d))
+            if d is None:
+                raw = DEFAULTS["send_timeout"]
+                values.append((scope, parse_time(raw), f"send_timeout {raw}; (default)", d))
+            else:
+                values.append((scope, parse_time(d.value()), d.text(), d))
         return values
 
     def check(self):
         """Audit: verificar send_timeout"""
+        unloaded = get_config().load_findings(self.id)
+        if unloaded:
+            # con parte de la configuracion sin cargar no se puede dar un PASS
+            return {
+                "id": self.id,
+                "status": "ERROR",
+                "output": "NGINX configuration only partly loaded",
+                "findings": unloaded
+            }
         values = self.find_send_timeout()
         if not values:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "send_timeout not set (defaults to 60s, insecure)"
+                "output": "send_timeout not set (defaults to 60s, insecure)",
+                "findings": [Finding(self.id, NGINX_CONF, expected="1-10s", actual="not set")]
             }
 
         findings = []
-        for f, val, line in values:
-            if val == 0 or val > 10:
-                findings.append(f"{f}: {line}")
+        for scope, val, line, d in values:
+            if val is None or val == 0 or val > 10:
+                if d is None:
+                    # el valor por defecto se atribuye al bloque que lo hereda
+                    block = scope.block
+                    findings.append(Finding(self.id, block.file if block else NGINX_CONF, block.line if block else None,
+                                            expected="1-10s", actual=line, message="inherited default"))
+                else:
+                    findings.append(Finding.from_directive(self.id, d, expected="1-10s"))
 
         if findings:
             return {
                 "id": self.id,
                 "status": "FAIL",
-                "output": "Invalid send_timeout found:\n" + "\n".join(findings)
+                "output": "Invalid send_timeout found",
+                "findings": findings
             }
         else:
             return {
@@ -54,44 +72,44 @@ class control_2_4_4:
 
     def remediate(self):
         """Remediation: set send_timeout to 10 in nginx.conf"""
-        conf_file = "/etc/nginx/nginx.conf"
-        if not os.path.exists(conf_file):
+        if NGINX_CONF in get_config().errors:
             return {
                 "id": self.id,
                 "status": "ERROR",
-                "output": f"{conf_file} not found"
+                "output": f"{NGINX_CONF} not found"
             }
 
         try:
-            with open(conf_file, "r") as conf:
-                lines = conf.readlines()
-
-            updated = False
-            new_lines = []
-            for line in lines:
-                if "send_timeout" in line and not line.strip().startswith("#"):
-                    new_lines.append("    send_timeout 10;\n")
-                    updated = True
-                else:
-                    new_lines.append(line)
-
-            if not updated:
-                # Insertar dentro del bloque http { }
-                for i, line in enumerate(new_lines):
-                    if line.strip().startswith("http {"):
-                        new_lines.insert(i + 1, "    send_timeout 10;\n")
-                        updated = True
-                        break
-
-            with open(conf_file, "w") as conf:
-                conf.writelines(new_lines)
-
-            subprocess.run("systemctl reload nginx", shell=True, check=False)
-
+            # nginx -t + recarga una sola vez al cerrar la transaccion
+            with config_transaction() as tx:
+                config = get_config()
+                inherits_default = False
+                unchanged = []
+                for _, val, _, d in self.find_send_timeout():
+                    if val is not None and 0 < val <= 10:
+                        continue
+                    if d is None:
+                        inherits_default = True
+                    elif not set_directive(d, "10"):
+                        unchanged.append(d.where())
+
+                if inherits_default:
+                    # Insertar dentro del bloque http { } para que lo hereden los server/location
+                    http = config.blocks("http")
+                    if http:
+                        add_directive(http[0].file, "send_timeout 10;", block=http[0])
+
+            if unchanged:
+                # p.ej. directiva partida en varias lineas: hay que editarla a mano
+                return {
+                    "id": self.id,
+                    "status": "ERROR",
+                    "output": f"send_timeout not changed (edit by hand): {', '.join(unchanged)}"
+                }
             return {
                 "id": self.id,
                 "status": "REMEDIATED",
-                "output": "send_timeout set to 10 in nginx.conf and nginx reloaded"
+                "output": "send_timeout set to 10 in nginx.conf" + (" and nginx reloaded" if tx.reloaded else "")
             }
 
         except Exception as e:
@@ -104,7 +122,7 @@ class control_2_4_4:
     def report(self):
         """Generar reporte en JSON"""
         result = self.check()
-        return json.dumps(result, indent=4)
+        return dumps(result, indent=4)
 
 
 # Ejemplo de uso
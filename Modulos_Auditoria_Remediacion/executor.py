@@ -0,0 +1,119 @@
+import asyncio
+import locale
+import subprocess
+import threading
+
+DEFAULT_LIMIT = 32                  # procesos hijos simultaneos como maximo
+DEFAULT_TIMEOUT = 120               # segundos si el llamador no indica timeout
+DEFAULT_OUTPUT_CAP = 16 * 1024 ** 2  # bytes que se guardan de stdout/stderr
+_CHUNK = 64 * 1024
+
+
+class CommandExecutor:
+    """Runs commands on one asyncio loop: timeouts, output caps, a process limit and
+    de-duplication of identical commands that are already running.
+
+    Callers stay synchronous: run() blocks the calling thread (a runner worker) while
+    the loop overlaps every command in flight.
+    """
+
+    def __init__(self, limit=DEFAULT_LIMIT, output_cap=DEFAULT_OUTPUT_CAP, timeout=DEFAULT_TIMEOUT):
+        self.limit = limit
+        self.output_cap = output_cap
+        self.timeout = timeout
+        self._loop = None
+        self._semaphore = None
+        self._inflight = {}  # clave del comando -> tarea (solo desde el hilo del loop)
+        self._lock = threading.Lock()
+
+    def configure(self, limit=None, output_cap=None, timeout=None):
+        """Change the limits (before the first command runs)"""
+        if limit is not None:
+            self.limit = limit
+            self._semaphore = None
+        if output_cap is not None:
+            self.output_cap = output_cap
+        if timeout is not None:
+            self.timeout = timeout
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="command-executor", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, cmd, shell=False, timeout=None, merge_stderr=False):
+        """Schedule a command and return a concurrent.futures.Future of its CompletedProcess"""
+        coro = self._shared(cmd, shell, timeout if timeout is not None else self.timeout, merge_stderr)
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, cmd, shell=False, timeout=None, merge_stderr=False):
+        """Same contract as subprocess.run(..., universal_newlines=True, stdout/stderr=PIPE)"""
+        return self.submit(cmd, shell, timeout, merge_stderr).result()
+
+    async def _shared(self, cmd, shell, timeout, merge_stderr):
+        key = (cmd if shell else tuple(cmd), shell, timeout, merge_stderr)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute(cmd, shell, timeout, merge_stderr))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: si un llamador se cancela, los demas siguen esperando el mismo proceso
+        return await asyncio.shield(task)
+
+    async def _execute(self, cmd, shell, timeout, merge_stderr):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        async with self._semaphore:
+            stderr = subprocess.STDOUT if merge_stderr else subprocess.PIPE
+            if shell:
+                proc = await asyncio.create_subprocess_shell(
+                    cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+            else:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+            streams = [proc.stdout] if merge_stderr else [proc.stdout, proc.stderr]
+            try:
+                *outputs, returncode = await asyncio.wait_for(
+                    asyncio.gather(*(self._read(s) for s in streams), proc.wait()),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+
+        result = subprocess.CompletedProcess(
+            cmd, returncode,
+            _text(outputs[0][0]),
+            None if merge_stderr else _text(outputs[1][0])
+        )
+        result.truncated = any(truncated for _, truncated in outputs)
+        return result
+
+    async def _read(self, stream):
+        """Read a stream to the end, keeping at most output_cap bytes"""
+        chunks = []
+        size = 0
+        truncated = False
+        while True:
+            chunk = await stream.read(_CHUNK)
+            if not chunk:
+                break
+            if size < self.output_cap:
+                chunks.append(chunk[:self.output_cap - size])
+            if size + len(chunk) > self.output_cap:
+                truncated = True
+            size += len(chunk)
+        return b"".join(chunks), truncated
+
+
+def _text(data):
+    # igual que universal_newlines=True, pero sin fallar con bytes invalidos
+    text = data.decode(locale.getpreferredencoding(False), errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+EXECUTOR = CommandExecutor()
@@ -0,0 +1,66 @@
+import json
+
+SEVERITIES = ("info", "low", "medium", "high")
+
+
+class Finding:
+    """One failed expectation of a control, kept as data until it is serialized"""
+    __slots__ = ("control", "path", "line", "expected", "actual", "severity", "message")
+
+    def __init__(self, control, path=None, line=None, expected=None, actual=None,
+                 severity="medium", message=None):
+        self.control = control
+        self.path = path          # archivo, directorio, comando o cuenta afectada
+        self.line = line
+        self.expected = expected
+        self.actual = actual
+        self.severity = severity
+        self.message = message    # etiqueta corta y fija (sin formatear)
+
+    @classmethod
+    def from_directive(cls, control, directive, expected=None, severity="medium", message=None):
+        """Finding pointing at a config directive (file, line and its text as the actual value)"""
+        return cls(control, directive.file, directive.line, expected, directive.text(), severity, message)
+
+    def where(self):
+        if self.path is None:
+            return None
+        return f"{self.path}:{self.line}" if self.line is not None else str(self.path)
+
+    def to_dict(self):
+        """Compact dict without the empty fields"""
+        return {f: getattr(self, f) for f in self.__slots__ if getattr(self, f) is not None}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{f: data.get(f) for f in cls.__slots__ if f in data})
+
+    def __str__(self):
+        parts = [p for p in (self.where(), self.message) if p]
+        text = ": ".join(parts + ([str(self.actual)] if self.actual is not None else []))
+        if self.expected is not None:
+            text += f" (expected {self.expected})"
+        return text
+
+    def __repr__(self):
+        return f"<Finding {self.control} {self}>"
+
+
+def to_json(obj):
+    """json.dumps default= hook: findings become dicts only when a result is written out"""
+    if isinstance(obj, Finding):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(result, **kwargs):
+    """json.dumps that understands Finding objects"""
+    return json.dumps(result, default=to_json, **kwargs)
+
+
+def revive(result):
+    """Turn serialized findings of a stored result back into Finding objects"""
+    findings = result.get("findings")
+    if findings:
+        result["findings"] = [Finding.from_dict(f) if isinstance(f, dict) else f for f in findings]
+    return result
@@ -0,0 +1,132 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import nginx_config
+import packages
+from executor import DEFAULT_LIMIT, EXECUTOR
+from findings import dumps
+from incremental import DEFAULT_STATE, IncrementalState
+from profiling import write_prometheus
+from reporter import NDJSONReporter
+from result_store import DEFAULT_STORE, ResultStore
+from runner import discover_controls, run_audit
+from transport import LocalTransport, RootTransport, SSHTransport, use_transport
+
+
+def make_transport(spec):
+    """Build a transport from a host spec: 'local', root:DIR or [user@]host[:port]"""
+    if spec == "local":
+        return LocalTransport()
+    if spec.startswith("root:"):
+        return RootTransport(spec[len("root:"):], host=spec)
+    user, _, host = spec.rpartition("@")
+    host, _, port = host.partition(":")
+    return SSHTransport(host, user=user or None, port=int(port) if port else None)
+
+
+def audit_host(spec, controls, workers=4, timeout=300, state=None, profile=False):
+    """Run every control against one host, never past its deadline"""
+    start = time.monotonic()
+    transport = None
+    try:
+        transport = make_transport(spec)
+        transport.deadline = start + timeout
+        with use_transport(transport):
+            if transport.name == "ssh":
+                # abre la conexion compartida antes de lanzar los controles
+                transport.run(["true"])
+            document = run_audit(controls, workers=workers, state=state, profile=profile)
+        document["host"] = spec
+        document["timed_out"] = time.monotonic() > transport.deadline
+        return document
+    except Exception as e:
+        return {
+            "host": spec,
+            "status": "UNREACHABLE",
+            "output": str(e),
+            "duration": round(time.monotonic() - start, 6)
+        }
+    finally:
+        if transport is not None:
+            transport.close()
+
+
+def run_fleet(hosts, controls=None, connections=32, workers=4, timeout=300, state=None, profile=False):
+    """Audit many hosts concurrently, yielding each host's document as it finishes"""
+    if controls is None:
+        controls = discover_controls()
+    with ThreadPoolExecutor(max_workers=max(1, connections)) as pool:
+        futures = [pool.submit(audit_host, h, controls, workers, timeout, state, profile) for h in hosts]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def read_hosts(path):
+    with open(path, "r") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the CIS NGINX controls against many hosts (one JSON line per host)")
+    parser.add_argument("hosts", nargs="*", help="hosts as [user@]host[:port], 'local', or root:DIR for a mounted image or snapshot")
+    parser.add_argument("-f", "--hosts-file", help="file with one host per line")
+    parser.add_argument("-c", "--connections", type=int, default=32, help="hosts audited at the same time")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="checks run concurrently on each host")
+    parser.add_argument("--format", choices=("json", "ndjson"), default="json", help="one JSON line per host, or one line per control/finding")
+    parser.add_argument("-t", "--timeout", type=float, default=300, help="seconds allowed per host")
+    parser.add_argument("--only", nargs="+", metavar="ID", help="only run these control ids")
+    parser.add_argument("-i", "--incremental", action="store_true", help="reuse results of controls whose inputs did not change")
+    parser.add_argument("--state", default=DEFAULT_STATE, help="state file used by --incremental")
+    parser.add_argument("--full-every", type=float, default=24, metavar="HOURS", help="force a full re-check after this many hours")
+    parser.add_argument("--cacheonly", action="store_true", help="never let dnf download repository metadata")
+    parser.add_argument("--package-ttl", type=float, default=packages.DEFAULT_TTL, metavar="SECONDS", help="reuse cached rpm/dnf results for this long")
+    parser.add_argument("--nginx-T", dest="dump", action="store_true", help="read the configuration from one 'nginx -T' dump instead of opening each file")
+    parser.add_argument("--max-procs", type=int, default=DEFAULT_LIMIT, help="maximum number of commands running at the same time")
+    parser.add_argument("--store", nargs="?", const=DEFAULT_STORE, metavar="DB", help="also append the results to the SQLite history (default %(const)s)")
+    parser.add_argument("--profile", action="store_true", help="add wall/CPU time, commands and file reads to each result")
+    parser.add_argument("--prometheus", metavar="FILE", help="also write the profiles of every host in Prometheus text format (implies --profile)")
+    args = parser.parse_args(argv)
+
+    EXECUTOR.configure(limit=args.max_procs)
+    packages.configure(ttl=args.package_ttl, cacheonly=args.cacheonly)
+    if args.dump:
+        nginx_config.configure(source="dump")
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        hosts += read_hosts(args.hosts_file)
+    if not hosts:
+        parser.error("no hosts given")
+
+    controls = discover_controls(args.only)
+    state = IncrementalState(args.state, args.full_every * 3600) if args.incremental else None
+    store = ResultStore(args.store) if args.store else None
+    reporter = NDJSONReporter(sys.stdout) if args.format == "ndjson" else None
+    profiles = []  # solo id + perfil de cada resultado, para --prometheus
+    try:
+        for document in run_fleet(hosts, controls, args.connections, args.workers, args.timeout, state,
+                                  profile=args.profile or bool(args.prometheus)):
+            if reporter is not None:
+                reporter.document(document)
+            else:
+                sys.stdout.write(dumps(document) + "\n")
+                sys.stdout.flush()
+            if store is not None:
+                store.record(document)
+            if args.prometheus:
+                profiles.append({
+                    "host": document["host"],
+                    "results": [{"id": r["id"], "profile": r.get("profile")} for r in document.get("results", ())]
+                })
+    finally:
+        if state is not None:
+            state.save()
+        if store is not None:
+            store.close()
+        if args.prometheus:
+            write_prometheus(args.prometheus, profiles)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import os
+import stat
+from transport import get_transport
+
+NGINX_DIR = "/etc/nginx"
+
+
+class Entry:
+    """Ownership and permission bits of one filesystem entry"""
+    __slots__ = ("path", "is_dir", "uid", "gid", "mode", "size", "mtime", "error")
+
+    def __init__(self, path, is_dir=False, st=None, error=None):
+        self.path = path
+        self.is_dir = is_dir
+        self.uid = st.st_uid if st is not None else None
+        self.gid = st.st_gid if st is not None else None
+        self.mode = stat.S_IMODE(st.st_mode) if st is not None else None
+        self.size = st.st_size if st is not None else None
+        self.mtime = st.st_mtime if st is not None else None
+        self.error = error
+
+
+class TreeSnapshot:
+    """Every entry below a directory, collected in one traversal"""
+
+    def __init__(self, top, exists, entries):
+        self.top = top
+        self.exists = exists
+        self.entries = entries
+        self._by_path = {e.path: e for e in entries}
+
+    def get(self, path):
+        return self._by_path.get(path)
+
+
+def scan_tree(top):
+    """Walk top once, stat'ing each entry a single time"""
+    transport = get_transport()
+    if not transport.exists(top):
+        return TreeSnapshot(top, False, [])
+    entries = [Entry(path, is_dir, st, error) for path, is_dir, st, error in transport.scan(top)]
+    return TreeSnapshot(top, True, entries)
+
+
+def get_snapshot(top=NGINX_DIR):
+    """Snapshot of top shared by every control in this run"""
+    return get_transport().memo(("fs_scan", top), lambda: scan_tree(top))
+
+
+def reset_snapshot(top=NGINX_DIR):
+    """Forget the cached snapshot (call after changing ownership or modes)"""
+    get_transport().forget(("fs_scan", top))
+
+
+def lookup(path):
+    """Entry for a single path, served from the /etc/nginx snapshot when it lies inside it"""
+    path = os.path.normpath(path)
+    if path.startswith(NGINX_DIR + os.sep):
+        entry = get_snapshot().get(path)
+        if entry is not None:
+            return entry
+    try:
+        st = get_transport().stat(path)
+    except FileNotFoundError:
+        return None
+    return Entry(path, stat.S_ISDIR(st.st_mode), st)
@@ -0,0 +1,147 @@
+import http.client
+import re
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from transport import get_transport
+
+DEFAULT_TIMEOUT = 5          # segundos para conectar y para cada lectura
+MAX_BODY = 64 * 1024         # bytes de cuerpo que se leen para reutilizar la conexion
+INVALID_HOSTS = ("invalid.host.com", "unknown.invalid")
+WILDCARDS = {"*": "127.0.0.1", "0.0.0.0": "127.0.0.1", "::": "::1"}
+LOOPBACK = re.compile(r"^(127\.|::1$|localhost$)")
+
+
+class Target:
+    """One address:port NGINX listens on"""
+    __slots__ = ("host", "port", "tls")
+
+    def __init__(self, host, port, tls=False):
+        self.host = host
+        self.port = port
+        self.tls = tls
+
+    def key(self):
+        return (self.host, self.port, self.tls)
+
+    def address(self, remote=None):
+        """Address to connect to from here; None if only reachable from inside the remote host"""
+        if self.host in WILDCARDS:
+            return remote or WILDCARDS[self.host]
+        if remote and LOOPBACK.match(self.host):
+            return None
+        return self.host
+
+    def __str__(self):
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"{'https' if self.tls else 'http'}://{host}:{self.port}"
+
+
+class ProbeResult:
+    """Outcome of one request: HTTP status, 444 if NGINX closed without answering, or an error"""
+    __slots__ = ("target", "host_header", "status", "error", "elapsed")
+
+    def __init__(self, target, host_header, status=None, error=None, elapsed=0.0):
+        self.target = target
+        self.host_header = host_header
+        self.status = status
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def answered(self):
+        """False if the request never got an HTTP answer (connection refused, timeout...)"""
+        return self.status is not None
+
+    @property
+    def rejected(self):
+        return self.status is not None and 400 <= self.status < 500
+
+    def __str__(self):
+        outcome = self.status if self.status is not None else f"error ({self.error})"
+        return f"{self.target} Host: {self.host_header} -> {outcome}"
+
+
+def parse_listen(args):
+    """Target for the arguments of a listen directive, or None for unix sockets"""
+    address = args[0] if args else "80"
+    if address.startswith("unix:"):
+        return None
+    tls = "ssl" in args[1:]
+    match = re.fullmatch(r"\[([^\]]+)\](?::(\d+))?|([^:]+):(\d+)|(\d+)|([^:]+)", address)
+    if match is None:
+        return None
+    v6, v6_port, host, port, only_port, only_host = match.groups()
+    host = v6 or host or only_host or "*"
+    port = int(v6_port or port or only_port or 80)
+    return Target(host, port, tls)
+
+
+def listen_targets(config):
+    """Every distinct address:port of the http server blocks (port 80 if a server has no listen)"""
+    targets = {}
+    for server in config.scopes("server", parent="http"):
+        listens = server.get("listen") or [None]
+        for d in listens:
+            target = parse_listen(d.args if d is not None else [])
+            if target is not None:
+                targets.setdefault(target.key(), target)
+    return list(targets.values())
+
+
+def _connect(target, address, timeout):
+    if target.tls:
+        # como curl -k: lo que se prueba es el enrutamiento por Host, no el certificado
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return http.client.HTTPSConnection(address, target.port, timeout=timeout, context=context)
+    return http.client.HTTPConnection(address, target.port, timeout=timeout)
+
+
+def probe_target(target, hosts=INVALID_HOSTS, timeout=DEFAULT_TIMEOUT, path="/", remote=None):
+    """Send one GET per Host header over a single keep-alive connection"""
+    address = target.address(remote)
+    if address is None:
+        return [ProbeResult(target, host, error="listens on loopback of the remote host") for host in hosts]
+    results = []
+    conn = _connect(target, address, timeout)
+    try:
+        for host in hosts:
+            start = time.monotonic()
+            try:
+                conn.request("GET", path, headers={"Host": host, "User-Agent": "cis-nginx-audit"})
+                response = conn.getresponse()
+                body = response.read(MAX_BODY)
+                if len(body) == MAX_BODY and not response.isclosed():
+                    conn.close()  # cuerpo demasiado grande: no se reutiliza
+                results.append(ProbeResult(target, host, response.status, elapsed=time.monotonic() - start))
+            except (http.client.RemoteDisconnected, ConnectionResetError):
+                # return 444: nginx cierra la conexion sin responder
+                conn.close()
+                results.append(ProbeResult(target, host, 444, elapsed=time.monotonic() - start))
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                error = "timed out" if isinstance(e, socket.timeout) else str(e) or type(e).__name__
+                results.append(ProbeResult(target, host, error=error, elapsed=time.monotonic() - start))
+                # listener caido o colgado: no se espera otro timeout por cada Host
+                results.extend(ProbeResult(target, h, error=error) for h in hosts[len(results):])
+                break
+    finally:
+        conn.close()
+    return results
+
+
+def probe_all(targets, hosts=INVALID_HOSTS, timeout=DEFAULT_TIMEOUT, workers=16):
+    """Probe every target concurrently; results keep the order of targets"""
+    if not targets:
+        return []
+    transport = get_transport()
+    # SSHTransport: se prueba desde esta maquina (RootTransport tambien tiene host, pero es local)
+    remote = transport.host if transport.name == "ssh" else None
+    if transport.deadline is not None:
+        timeout = min(timeout, max(transport.deadline - time.monotonic(), 0.1))
+    with ThreadPoolExecutor(max_workers=min(workers, len(targets))) as pool:
+        batches = pool.map(lambda t: probe_target(t, hosts, timeout, remote=remote), targets)
+        return [r for batch in batches for r in batch]
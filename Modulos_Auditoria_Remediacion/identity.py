@@ -0,0 +1,121 @@
+from transport import get_transport
+
+ROOT_UID = 0
+ROOT_GID = 0
+PASSWD = "/etc/passwd"
+GROUP = "/etc/group"
+SHADOW = "/etc/shadow"
+
+
+def _lookup(key, resolve):
+    """Memoize one NSS lookup per host for the whole run (misses included)"""
+    def probe():
+        try:
+            return resolve()
+        except KeyError:
+            return None
+    return get_transport().memo(key, probe)
+
+
+def user_name(uid):
+    """Name of a uid, or the number itself if it has no passwd entry"""
+    transport = get_transport()
+    name = _lookup(("uid", uid), lambda: transport.getpwuid(uid).pw_name)
+    return name if name is not None else str(uid)
+
+
+def group_name(gid):
+    """Name of a gid, or the number itself if it has no group entry"""
+    transport = get_transport()
+    name = _lookup(("gid", gid), lambda: transport.getgrgid(gid).gr_name)
+    return name if name is not None else str(gid)
+
+
+def group_id(name):
+    """gid of a group name, or None if the group does not exist"""
+    transport = get_transport()
+    return _lookup(("group", name), lambda: transport.getgrnam(name).gr_gid)
+
+
+def user_entry(name):
+    """passwd entry of a user name, or None if it does not exist"""
+    transport = get_transport()
+    return _lookup(("user", name), lambda: transport.getpwnam(name))
+
+
+def user_group_ids(name):
+    """Set of gids a user belongs to (primary + supplementary), computed once per run"""
+    entry = user_entry(name)
+    if entry is None:
+        return frozenset()
+    transport = get_transport()
+    return transport.memo(
+        ("groups_of", name),
+        lambda: frozenset(transport.getgrouplist(name, entry.pw_gid))
+    )
+
+
+def forget_user(name):
+    """Drop cached lookups for a user (after creating or modifying it)"""
+    transport = get_transport()
+    for key in (("user", name), ("groups_of", name), ("group", name)):
+        transport.forget(key)
+
+
+def owner_text(uid, gid):
+    """'owner:group' for messages, resolving names only when needed"""
+    return f"{user_name(uid)}:{group_name(gid)}"
+
+
+class ShadowEntry:
+    """Lock state of one /etc/shadow account (the hash itself is not kept)"""
+    __slots__ = ("name", "marker", "locked", "empty")
+
+    def __init__(self, name, password):
+        self.name = name
+        # "!" = bloqueada con passwd -l, "*" / "!!" = sin contrasena utilizable
+        self.locked = password.startswith(("!", "*"))
+        self.empty = password == ""
+        self.marker = (password[:2] if password.startswith("!!") else password[:1]) if self.locked else ""
+
+    @property
+    def status(self):
+        """Same codes as passwd -S: LK (locked), NP (no password), PS (usable password)"""
+        if self.locked:
+            return "LK"
+        return "NP" if self.empty else "PS"
+
+
+def parse_shadow(text):
+    """{name: ShadowEntry} for every line of a shadow file"""
+    entries = {}
+    for line in text.splitlines():
+        fields = line.split(":")
+        if len(fields) >= 2 and fields[0] and not line.startswith("#"):
+            entries[fields[0]] = ShadowEntry(fields[0], fields[1])
+    return entries
+
+
+def shadow_entries(path=SHADOW):
+    """Parsed shadow file, read once per host; None when it cannot be read (not root)"""
+    transport = get_transport()
+
+    def load():
+        try:
+            return parse_shadow(transport.read_text(path))
+        except OSError:
+            return None
+    return transport.memo(("shadow", path), load)
+
+
+def shadow_entry(name, path=SHADOW):
+    """ShadowEntry of an account, None if it has none, or False if shadow is unreadable"""
+    entries = shadow_entries(path)
+    if entries is None:
+        return False
+    return entries.get(name)
+
+
+def forget_shadow(path=SHADOW):
+    """Drop the cached shadow file (after passwd -l / usermod)"""
+    get_transport().forget(("shadow", path))
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import stat
+import sys
+import threading
+import time
+from findings import revive, to_json
+from fs_scan import get_snapshot
+from nginx_config import CONFIG_FILES, get_config
+from transport import get_transport
+
+DEFAULT_STATE = os.path.expanduser("~/.cache/cis-nginx-audit/state.json")
+DEFAULT_FULL_EVERY = 24 * 3600  # segundos entre revisiones completas forzadas
+RUN_FIELDS = ("title", "duration", "profile", "cached")  # propios de cada ejecucion, no se guardan
+# modulos compartidos cuyo codigo decide el resultado de los controles
+SHARED_MODULES = ("findings", "fs_scan", "http_probe", "identity", "nginx_build", "nginx_config", "packages")
+
+
+def _input_fingerprint(item):
+    """Fingerprint of one input: a file's content, a directory's metadata, or a command's binary"""
+    if item == CONFIG_FILES:
+        return _config_fingerprint()
+    transport = get_transport()
+    if not item.startswith("/"):
+        path = transport.which(item)
+        if path is None:
+            return f"{item}:missing"
+        st = transport.stat(path)
+        return f"{item}:{path}:{st.st_ino}:{st.st_mtime}:{st.st_size}"
+
+    try:
+        st = transport.stat(item)
+    except FileNotFoundError:
+        return f"{item}:missing"
+
+    if stat.S_ISDIR(st.st_mode):
+        digest = hashlib.sha256()
+        for e in sorted(get_snapshot(item).entries, key=lambda e: e.path):
+            digest.update(f"{e.path}|{e.uid}|{e.gid}|{e.mode}|{e.size}|{e.mtime}|{e.error}\n".encode())
+        return f"{item}:dir:{stat.S_IMODE(st.st_mode)}:{st.st_uid}:{st.st_gid}:{digest.hexdigest()}"
+
+    meta = f"{stat.S_IMODE(st.st_mode)}:{st.st_uid}:{st.st_gid}"
+    try:
+        content = transport.read_text(item)
+    except OSError:
+        # sin permiso de lectura (p.ej. /etc/shadow): solo metadatos
+        return f"{item}:{meta}:{st.st_ino}:{st.st_mtime}:{st.st_size}"
+    return f"{item}:{meta}:{hashlib.sha256(content.encode()).hexdigest()}"
+
+
+def _config_fingerprint():
+    """Fingerprint of every file the parsed config loads, includes outside /etc/nginx too"""
+    config = get_config()
+    digest = hashlib.sha256()
+    for path in config.files:
+        digest.update(_input_fingerprint(path).encode() + b"\n")
+    for path, error in sorted(config.errors.items()):
+        digest.update(f"{path}:{error}\n".encode())
+    return f"{CONFIG_FILES}{digest.hexdigest()}"
+
+
+_shared_digest = None
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _shared_fingerprint():
+    """Hash of the shared modules' code, computed once per process"""
+    global _shared_digest
+    if _shared_digest is None:
+        here = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for name in SHARED_MODULES:
+            path = os.path.join(here, f"{name}.py")
+            digest.update(f"{name}:{_file_digest(path) if os.path.exists(path) else 'missing'}\n".encode())
+        _shared_digest = digest.hexdigest()
+    return _shared_digest
+
+
+def _source_fingerprint(control):
+    """Hash of the control's own code and of the shared modules, so an updated check always re-runs"""
+    path = getattr(sys.modules.get(type(control).__module__), "__file__", None)
+    own = _file_digest(path) if path else ""
+    return f"{own}:{_shared_fingerprint()}"
+
+
+def fingerprint(control):
+    """Fingerprint of everything a control's check() depends on, or None if it must always run"""
+    if getattr(control, "inputs", None) is None:
+        return None
+    digest = hashlib.sha256()
+    digest.update(json.dumps(vars(control), sort_keys=True, default=str).encode())
+    digest.update(_source_fingerprint(control).encode())
+    for item in control.inputs:
+        digest.update(_input_fingerprint(item).encode() + b"\n")
+    return digest.hexdigest()
+
+
+class IncrementalState:
+    """Local store of previous results, keyed by host and control id"""
+
+    def __init__(self, path=DEFAULT_STATE, full_every=DEFAULT_FULL_EVERY):
+        self.path = path
+        self.full_every = full_every
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r") as f:
+                self._state = json.load(f)
+        except (OSError, ValueError):
+            self._state = {}
+
+    def reuse(self, host, control, fp):
+        """Previous result if the inputs did not change and the full re-check is not due"""
+        if fp is None:
+            return None
+        with self._lock:
+            entry = self._state.get(host, {}).get(control.id)
+        if not entry or entry.get("fingerprint") != fp:
+            return None
+        if time.time() - entry.get("checked", 0) >= self.full_every:
+            return None
+        result = revive(dict(entry["result"]))
+        # estados escritos por versiones anteriores guardaban tambien estos campos de la ejecucion
+        for key in RUN_FIELDS:
+            result.pop(key, None)
+        return result
+
+    def record(self, host, control, fp, result):
+        # los errores (timeouts, fallos de conexion) se vuelven a intentar siempre
+        if fp is None or result.get("status") == "ERROR":
+            return
+        with self._lock:
+            self._state.setdefault(host, {})[control.id] = {
+                "fingerprint": fp,
+                "checked": time.time(),
+                # copia: run_control sigue anadiendo title/duration/profile al resultado vivo
+                "result": {k: v for k, v in result.items() if k not in RUN_FIELDS},
+            }
+
+    def save(self):
+        """Write the state atomically"""
+        with self._lock:
+            data = json.dumps(self._state, default=to_json)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
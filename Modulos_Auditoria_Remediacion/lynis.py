@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+CHUNK_SIZE = 64 * 1024
+
+# Marcas que separan los elementos del informe, tanto en la salida normal de Lynis
+# (una linea por elemento) como en la version aplanada en una sola linea (logs.txt)
+_BOUNDARY_RE = re.compile(r"""
+    (?:^|(?<=\s))
+    (?: (?P<bullet>[*!]\s)
+      | (?P<section>Warnings|Suggestions)\s\(\d+\):
+      | (?P<end>Follow-up:|Great,\sno\swarnings)
+    )
+""", re.X)
+_FINDING_RE = re.compile(r"^(?P<message>.*?)\s*\[(?P<test_id>[A-Z]+-\d+)\](?P<rest>.*)$", re.S)
+_FIELD_RE = re.compile(r"-\s*(Details|Solution)\s*:\s*(.*?)\s*(?=-\s*(?:Details|Solution|Related resources)\b|$)", re.S)
+_URL_RE = re.compile(r"https?://\S+")
+
+
+class LynisFinding:
+    """One warning or suggestion of a Lynis report"""
+    __slots__ = ("host", "kind", "test_id", "message", "details", "solution", "links")
+
+    def __init__(self, host, kind, test_id, message, details=None, solution=None, links=None):
+        self.host = host
+        self.kind = kind          # "warning" o "suggestion"
+        self.test_id = test_id
+        self.message = message
+        self.details = details
+        self.solution = solution
+        self.links = links or []
+
+    @property
+    def category(self):
+        """Test group of the ID (AUTH, KRNL, HTTP...)"""
+        return self.test_id.split("-", 1)[0]
+
+    def to_dict(self):
+        data = {f: getattr(self, f) for f in self.__slots__}
+        data["category"] = self.category
+        return data
+
+
+def _segments(stream):
+    """Yield (marker, section, text) for each element, reading the stream in chunks"""
+    buffer = ""
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        buffer += chunk
+        matches = list(_BOUNDARY_RE.finditer(buffer))
+        if chunk and len(matches) < 2:
+            continue  # el elemento sigue en el proximo bloque
+        ends = [m.start() for m in matches[1:]] + [len(buffer)]
+        if chunk:
+            # el texto tras la ultima marca puede seguir en el proximo bloque
+            matches, ends = matches[:-1], ends[:-1]
+        for m, end in zip(matches, ends):
+            yield m.lastgroup, m.group("section"), " ".join(buffer[m.end():end].split())
+        if not chunk:
+            return
+        buffer = buffer[ends[-1]:]
+
+
+def parse_report(stream, host=None):
+    """Stream LynisFinding records out of Lynis console output of any size"""
+    section = None
+    current = None
+    for marker, name, text in _segments(stream):
+        if marker != "bullet":
+            if current is not None:
+                yield current
+                current = None
+            section = name.lower()[:-1] if marker == "section" else None
+            continue
+        if section is None:
+            continue
+        finding = _FINDING_RE.match(text)
+        if finding is not None:
+            if current is not None:
+                yield current
+            rest = finding.group("rest")
+            # en la salida normal el enlace de cada test va en su propia linea
+            fields = {k.lower(): v.strip() for k, v in _FIELD_RE.findall(_URL_RE.sub("", rest))}
+            current = LynisFinding(
+                host, section, finding.group("test_id"), finding.group("message"),
+                details=fields.get("details") or None,
+                solution=fields.get("solution") or None,
+                links=_URL_RE.findall(rest)
+            )
+        elif current is not None:
+            # "* Article: ...: URL" / "* Website: URL" del bloque Related resources
+            current.links.extend(_URL_RE.findall(text))
+    if current is not None:
+        yield current
+
+
+def parse_file(path, host=None):
+    """parse_report over a file; the host defaults to the file name without extension"""
+    if host is None:
+        host = os.path.splitext(os.path.basename(path))[0]
+    with open(path, "r", errors="replace") as f:
+        yield from parse_report(f, host)
+
+
+class LynisIndex:
+    """Test ID / category index over many reports; findings themselves stay on disk"""
+
+    def __init__(self):
+        self.reports = {}      # host -> archivo del informe
+        self.by_test = {}      # test_id -> {host: ocurrencias}
+        self.by_category = {}  # categoria -> set de test_id
+
+    def add(self, path, host=None):
+        """Index one report in a single streaming pass"""
+        for finding in parse_file(path, host):
+            self.reports[finding.host] = path
+            hosts = self.by_test.setdefault(finding.test_id, {})
+            hosts[finding.host] = hosts.get(finding.host, 0) + 1
+            self.by_category.setdefault(finding.category, set()).add(finding.test_id)
+        if host is not None:
+            self.reports.setdefault(host, path)
+
+    def hosts_with(self, test_id):
+        return sorted(self.by_test.get(test_id, ()))
+
+    def tests_in(self, category):
+        return sorted(self.by_category.get(category, ()))
+
+    def findings(self, host, test_ids=None, categories=None):
+        """Re-read one host's report and yield its findings, optionally filtered"""
+        path = self.reports.get(host)
+        if path is None:
+            return
+        for finding in parse_file(path, host):
+            if test_ids is not None and finding.test_id not in test_ids:
+                continue
+            if categories is not None and finding.category not in categories:
+                continue
+            yield finding
+
+    def join(self, document, categories=None):
+        """Attach the Lynis findings of document["host"] to a runner result document"""
+        document["lynis"] = [f.to_dict() for f in self.findings(document["host"], categories=categories)]
+        return document
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Turn Lynis console reports into NDJSON findings")
+    parser.add_argument("reports", nargs="+", metavar="[HOST=]FILE", help="report files (host defaults to the file name)")
+    parser.add_argument("--category", nargs="+", help="only these categories (e.g. HTTP AUTH)")
+    parser.add_argument("--summary", action="store_true", help="print the test ID/category index instead of the findings")
+    args = parser.parse_args(argv)
+
+    index = LynisIndex()
+    for spec in args.reports:
+        host, _, path = spec.rpartition("=")
+        if args.summary:
+            index.add(path, host or None)
+            continue
+        for finding in parse_file(path, host or None):
+            if args.category and finding.category not in args.category:
+                continue
+            sys.stdout.write(json.dumps(finding.to_dict()) + "\n")
+    if args.summary:
+        summary = {
+            category: {t: index.hosts_with(t) for t in index.tests_in(category)}
+            for category in sorted(index.by_category)
+            if not args.category or category in args.category
+        }
+        print(json.dumps(summary, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import re
+import shlex
+from transport import get_transport
+
+# Modulos http que nginx compila por defecto (se desactivan con --without-*)
+DEFAULT_MODULES = {
+    "http_access_module", "http_auth_basic_module", "http_autoindex_module",
+    "http_browser_module", "http_charset_module", "http_empty_gif_module",
+    "http_fastcgi_module", "http_geo_module", "http_grpc_module",
+    "http_gzip_module", "http_limit_conn_module", "http_limit_req_module",
+    "http_map_module", "http_memcached_module", "http_mirror_module",
+    "http_proxy_module", "http_referer_module", "http_rewrite_module",
+    "http_scgi_module", "http_split_clients_module", "http_ssi_module",
+    "http_upstream_hash_module", "http_upstream_ip_hash_module",
+    "http_upstream_keepalive_module", "http_upstream_least_conn_module",
+    "http_upstream_random_module", "http_upstream_zone_module",
+    "http_userid_module", "http_uwsgi_module",
+}
+
+
+class BuildInfo:
+    """Parsed output of 'nginx -V'"""
+
+    def __init__(self, raw, returncode=0):
+        self.raw = raw
+        self.returncode = returncode
+        self.version = None
+        self.compiler = None
+        self.configure_args = []
+        self.flags = {}              # --opcion -> valor (None si es un flag)
+        self.with_modules = set()
+        self.without_modules = set()
+        self._parse(raw)
+
+    def _parse(self, raw):
+        for line in raw.splitlines():
+            line = line.strip()
+            if line.startswith("nginx version:"):
+                match = re.search(r"nginx/(\S+)", line)
+                self.version = match.group(1) if match else line.split(":", 1)[1].strip()
+            elif line.startswith("built by"):
+                self.compiler = line[len("built by"):].strip()
+            elif line.startswith("configure arguments:"):
+                args = line.split(":", 1)[1]
+                try:
+                    self.configure_args = shlex.split(args)
+                except ValueError:
+                    self.configure_args = args.split()
+
+        for arg in self.configure_args:
+            name, sep, value = arg.partition("=")
+            self.flags[name] = value if sep else None
+            if name.startswith("--with-") and not sep:
+                self.with_modules.add(name[len("--with-"):])
+            elif name.startswith("--without-"):
+                self.without_modules.add(name[len("--without-"):])
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+    def has_module(self, module):
+        """True if the module is compiled in (explicitly or by default)"""
+        if module in self.with_modules:
+            return True
+        if module in self.without_modules:
+            return False
+        return module in DEFAULT_MODULES
+
+
+def nginx_binary():
+    """Path of the nginx binary on PATH, or None"""
+    return get_transport().which("nginx")
+
+
+def get_build_info(binary=None):
+    """Run 'nginx -V' once per binary (path, mtime, inode) and return its BuildInfo"""
+    transport = get_transport()
+    binary = binary or nginx_binary()
+    if binary is None:
+        raise FileNotFoundError("nginx")
+    st = transport.stat(binary)
+
+    def probe():
+        # nginx -V escribe en stderr
+        result = transport.run([binary, "-V"], merge_stderr=True)
+        return BuildInfo(result.stdout, result.returncode)
+
+    return transport.memo(("nginx_build", binary, st.st_mtime, st.st_ino), probe)
@@ -0,0 +1,429 @@
+import fnmatch
+import posixpath
+import re
+from findings import Finding
+from transport import get_transport
+
+NGINX_CONF = "/etc/nginx/nginx.conf"
+PID_FILE = "/var/run/nginx.pid"  # --pid-path por defecto de los paquetes
+CONFIG_FILES = "nginx-config:"   # entrada de los controles: todos los archivos que carga la config
+DUMP_MARKER = re.compile(r"^# configuration file (.+):$", re.M)
+
+# Bloques por los que se heredan las directivas del modulo http
+HTTP_SCOPES = ("http", "server", "location", "if", "limit_except")
+
+# Valores por defecto de nginx para las directivas que se auditan
+DEFAULTS = {
+    "keepalive_timeout": "75s",
+    "send_timeout": "60s",
+}
+
+_TIME_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800, "M": 2592000, "y": 31536000}
+_TIME_RE = re.compile(r"(\d+)(ms|[smhdwMy]?)")
+
+# Opciones globales de la corrida (el runner las ajusta con configure())
+settings = {
+    "source": "files",  # "files" (leer cada archivo) o "dump" (un solo nginx -T)
+}
+
+
+def configure(source=None):
+    """Choose whether the config is read file by file or from one nginx -T dump"""
+    if source is not None:
+        settings["source"] = source
+
+
+class Directive:
+    """A single NGINX directive with file/line provenance"""
+    __slots__ = ("name", "args", "file", "line", "open_line", "children", "parent", "included")
+
+    def __init__(self, name, args, file, line, parent=None):
+        self.name = name
+        self.args = args
+        self.file = file
+        self.line = line
+        self.open_line = None  # linea de la llave de apertura si es un bloque (puede ir en otra linea)
+        self.children = None  # lista de directivas si es un bloque
+        self.parent = parent
+        self.included = None  # archivos que carga un include, en orden
+
+    @property
+    def is_block(self):
+        return self.children is not None
+
+    def value(self):
+        """First argument of the directive, or None"""
+        return self.args[0] if self.args else None
+
+    def child(self, name):
+        """First direct child directive called name, or None"""
+        for d in self.children or ():
+            if d.name == name:
+                return d
+        return None
+
+    def text(self):
+        """Directive rendered as it would appear in the config"""
+        body = " ".join([self.name, *self.args])
+        return body + (" { ... }" if self.is_block else ";")
+
+    def where(self):
+        return f"{self.file}:{self.line}"
+
+    def __repr__(self):
+        return f"<Directive {self.text()} at {self.where()}>"
+
+
+class Scope:
+    """A block (main/http/server/location...) with its direct directives, includes spliced in"""
+    __slots__ = ("name", "block", "parent", "directives", "_config")
+
+    def __init__(self, config, block, directives, parent=None):
+        self.name = block.name if block is not None else "main"
+        self.block = block
+        self.parent = parent
+        self.directives = directives
+        self._config = config
+
+    def get(self, name):
+        """Direct directives called name"""
+        return [d for d in self.directives if d.name == name]
+
+    def first(self, name):
+        for d in self.directives:
+            if d.name == name:
+                return d
+        return None
+
+    def children(self, name=None):
+        """Nested blocks as scopes, optionally only those called name"""
+        return [
+            Scope(self._config, d, list(self._config.members(d.children)), self)
+            for d in self.directives
+            if d.is_block and (name is None or d.name == name)
+        ]
+
+    def where(self):
+        return self.block.where() if self.block is not None else self._config.files[0]
+
+    def __repr__(self):
+        return f"<Scope {self.name} at {self.where()}>"
+
+
+class NginxConfig:
+    """Parsed NGINX configuration shared by every control"""
+
+    def __init__(self):
+        self.files = []          # archivos parseados, en el orden en que nginx los carga
+        self.roots = {}          # archivo -> directivas de primer nivel
+        self.errors = {}         # archivo -> error de lectura
+        self.cycles = []         # (directiva include, ciclo) de los include que vuelven a un archivo ya abierto
+        self.included_from = {}  # archivo -> directiva include que lo cargo
+        self._index = {}         # nombre -> directivas en orden de aparicion
+        self._scopes = None      # scopes http/server/location..., calculados una vez
+        self._effective = {}     # nombre -> valores efectivos por scope
+
+    def load_findings(self, control):
+        """Findings for the files that could not be loaded (unreadable or include cycles)"""
+        findings = [Finding(control, path, actual=error, message="not loaded") for path, error in self.errors.items()]
+        findings += [Finding(control, include.file, include.line, actual=cycle, message="not loaded")
+                     for include, cycle in self.cycles]
+        return findings
+
+    def add_file(self, path, directives, include=None):
+        self.files.append(path)
+        self.roots[path] = directives
+        if include is not None:
+            self.included_from[path] = include
+
+    def _add(self, directive):
+        self._index.setdefault(directive.name, []).append(directive)
+
+    def find(self, name):
+        """All directives called name, in the order nginx reads them"""
+        return self._index.get(name, [])
+
+    def first(self, name):
+        found = self.find(name)
+        return found[0] if found else None
+
+    def enclosing(self, directive):
+        """Block enclosing a directive, following includes back to their site (None at top level)"""
+        d = directive
+        while d.parent is None:
+            d = self.included_from.get(d.file)
+            if d is None:
+                return None
+        return d.parent
+
+    def context_of(self, directive):
+        """Name of the block enclosing a directive ("main" at top level)"""
+        block = self.enclosing(directive)
+        return block.name if block is not None else "main"
+
+    def blocks(self, name, parent=None):
+        """Block directives called name, optionally only inside a parent block name"""
+        return [
+            d for d in self.find(name)
+            if d.is_block and (parent is None or self.context_of(d) == parent)
+        ]
+
+    def members(self, directives):
+        """Directives of one block level, with included files spliced in place of each include"""
+        stack = [iter(directives)]
+        while stack:
+            d = next(stack[-1], None)
+            if d is None:
+                stack.pop()
+            elif d.included is not None:
+                stack.extend(iter(self.roots[p]) for p in reversed(d.included))
+            else:
+                yield d
+
+    def root_scope(self):
+        """Top-level (main) scope of the whole configuration"""
+        if not self.files:
+            return Scope(self, None, [])
+        return Scope(self, None, list(self.members(self.roots[self.files[0]])))
+
+    def scopes(self, name, parent=None):
+        """Every block called name as a Scope, optionally only inside a parent block name"""
+        found = []
+        stack = list(reversed(self.root_scope().children()))
+        while stack:
+            scope = stack.pop()
+            if scope.name == name and (parent is None or scope.parent.name == parent):
+                found.append(scope)
+            stack.extend(reversed(scope.children()))
+        return found
+
+    def http_scopes(self):
+        """The http block and every scope nested in it through which http directives inherit"""
+        if self._scopes is None:
+            found = []
+            stack = [s for s in reversed(self.root_scope().children()) if s.name == "http"]
+            while stack:
+                scope = stack.pop()
+                found.append(scope)
+                stack.extend(reversed([s for s in scope.children() if s.name in HTTP_SCOPES]))
+            self._scopes = found
+        return self._scopes
+
+    def effective(self, name):
+        """[(scope, directive)] with the directive in force in every http scope.
+
+        A scope without its own directive inherits its parent's; directive is None
+        where nothing sets it (the nginx default, see DEFAULTS, applies).
+        """
+        if name not in self._effective:
+            resolved = {}
+            result = []
+            for scope in self.http_scopes():
+                own = scope.get(name)
+                if own:
+                    d = own[-1]
+                else:
+                    d = resolved.get(id(scope.parent))
+                resolved[id(scope)] = d
+                result.append((scope, d))
+            self._effective.setdefault(name, result)
+        return self._effective[name]
+
+
+def parse_time(text):
+    """Seconds in an nginx time value ("10", "10s", "1m30s", "500ms"), or None if invalid"""
+    if not text:
+        return None
+    pos = 0
+    total = 0.0
+    for m in _TIME_RE.finditer(text):
+        if m.start() != pos:
+            return None
+        total += int(m.group(1)) * _TIME_UNITS.get(m.group(2) or "s")
+        pos = m.end()
+    return total if pos == len(text) else None
+
+
+def iter_directives(directives):
+    """Depth-first iteration over a directive list"""
+    stack = list(reversed(directives))
+    while stack:
+        d = stack.pop()
+        yield d
+        if d.children:
+            stack.extend(reversed(d.children))
+
+
+# Como ngx_conf_read_token: una palabra solo termina en espacio, ';' o '{' (no en '}'),
+# y '${' dentro de una palabra es una variable, no la apertura de un bloque
+_TOKEN_RE = re.compile(r"""
+    (?P<nl>\n)
+  | (?P<ws>[ \t\r\f\v]+)
+  | (?P<comment>\#[^\n]*)
+  | (?P<quoted>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+  | (?P<punct>[{};])
+  | (?P<word>(?:\\.|\$\{|[^\s{};"'\\])(?:\\.|\$\{|[^\s{;\\])*)
+""", re.X | re.S)
+
+
+def tokenize(text):
+    """Yield (token, line, is_quoted) tuples from NGINX config text"""
+    line = 1
+    pos = 0
+    end = len(text)
+    while pos < end:
+        m = _TOKEN_RE.match(text, pos)
+        if m is None:
+            # caracter suelto (p.ej. comilla sin cerrar): se trata como palabra
+            yield text[pos], line, False
+            pos += 1
+            continue
+        kind = m.lastgroup
+        tok = m.group(kind)
+        if kind == "nl":
+            line += 1
+        elif kind == "quoted":
+            yield tok[1:-1], line, True
+            line += tok.count("\n")
+        elif kind in ("punct", "word"):
+            yield tok, line, False
+        pos = m.end()
+
+
+def parse(text, path):
+    """Parse config text into a list of top-level Directive objects"""
+    root = []
+    stack = [(None, root)]
+    words = []
+    start_line = None
+    for tok, line, quoted in tokenize(text):
+        parent, current = stack[-1]
+        if not quoted and tok == ";":
+            if words:
+                current.append(Directive(words[0], words[1:], path, start_line, parent))
+            words = []
+        elif not quoted and tok == "{":
+            if words:
+                block = Directive(words[0], words[1:], path, start_line, parent)
+            else:
+                block = Directive("", [], path, line, parent)
+            block.open_line = line
+            block.children = []
+            current.append(block)
+            stack.append((block, block.children))
+            words = []
+        elif not quoted and tok == "}":
+            # llave de cierre sin abrir: se ignora
+            if len(stack) > 1:
+                stack.pop()
+            words = []
+        else:
+            if not words:
+                start_line = line
+            words.append(tok)
+    return root
+
+
+def _has_magic(pattern):
+    return any(c in pattern for c in "*?[")
+
+
+def dump_buffers():
+    """Run nginx -T once and split its output into {path: text}, in dump order"""
+    result = get_transport().run(["nginx", "-T"], timeout=60)
+    if result.returncode != 0:
+        raise OSError(result.stderr.strip() or "nginx -T failed")
+    text = result.stdout
+    markers = list(DUMP_MARKER.finditer(text))
+    buffers = {}
+    for m, following in zip(markers, markers[1:] + [None]):
+        end = following.start() if following is not None else len(text)
+        buffers.setdefault(m.group(1), text[m.end() + 1:end])
+    return buffers
+
+
+def _glob_buffers(buffers, pattern):
+    # como glob(3): los comodines no cruzan "/"
+    depth = pattern.count("/")
+    return [p for p in buffers if p.count("/") == depth and fnmatch.fnmatchcase(p, pattern)]
+
+
+def load_config(path=NGINX_CONF, buffers=None):
+    """Read and parse the config once, following include directives like nginx does.
+
+    With buffers (see dump_buffers) files are taken from them instead of being read.
+    """
+    config = NginxConfig()
+    transport = get_transport()
+    if buffers is None:
+        read, glob, realpath = transport.read_text, transport.glob, transport.realpath
+    else:
+        def read(p):
+            if p not in buffers:
+                raise FileNotFoundError(f"{p} not in nginx -T output")
+            return buffers[p]
+
+        def glob(pattern):
+            return _glob_buffers(buffers, pattern)
+
+        def realpath(p):
+            return p
+    prefix = posixpath.dirname(path)
+    loaded = {}  # ruta real -> ruta con la que se cargo (dedup de symlinks)
+
+    def load(path, include, chain):
+        real = realpath(path)
+        if real in chain:
+            cycle = " -> ".join(chain[chain.index(real):] + [real])
+            # el archivo re-incluido si se pudo leer: el error es del include
+            config.cycles.append((include, f"include cycle: {cycle}"))
+            return None
+        if real in loaded:
+            return loaded[real]
+        try:
+            text = read(path)
+        except OSError as e:
+            config.errors[path] = str(e)
+            return None
+        directives = parse(text, path)
+        loaded[real] = path
+        config.add_file(path, directives, include)
+        for d in iter_directives(directives):
+            config._add(d)
+            if d.name != "include" or d.is_block or not d.args:
+                continue
+            # rutas relativas al prefijo de configuracion, globs en orden alfabetico
+            pattern = posixpath.join(prefix, d.args[0])
+            matches = sorted(glob(pattern)) if _has_magic(pattern) else [pattern]
+            d.included = []
+            for match in matches:
+                got = load(match, d, chain + [real])
+                if got is not None:
+                    d.included.append(got)
+        return path
+
+    load(path, None, [])
+    return config
+
+
+def _load():
+    if settings["source"] == "dump":
+        try:
+            buffers = dump_buffers()
+        except OSError:
+            buffers = None  # nginx -T no disponible: se leen los archivos
+        if buffers:
+            # el primer archivo del volcado es el nginx.conf que usa el binario
+            return load_config(next(iter(buffers)), buffers)
+    return load_config()
+
+
+def get_config():
+    """Return the parsed config for this run, parsing it on first use"""
+    return get_transport().memo("nginx_config", _load)
+
+
+def reset_config():
+    """Drop the cached config (call after editing config files)"""
+    get_transport().forget("nginx_config")
+
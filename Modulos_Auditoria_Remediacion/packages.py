@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+from transport import get_transport
+
+REPOS_DIR = "/etc/yum.repos.d"
+DEFAULT_CACHE = os.path.expanduser("~/.cache/cis-nginx-audit/packages.json")
+DEFAULT_TTL = 3600  # segundos que se reutiliza la informacion de paquetes
+
+# Opciones globales de la corrida (el runner las ajusta con configure())
+settings = {
+    "cache_file": DEFAULT_CACHE,
+    "ttl": DEFAULT_TTL,
+    "cacheonly": False,
+}
+_file_lock = threading.Lock()
+
+
+def configure(cache_file=None, ttl=None, cacheonly=None):
+    """Change where/for how long package state is cached and whether dnf may refresh metadata"""
+    if cache_file is not None:
+        settings["cache_file"] = cache_file
+    if ttl is not None:
+        settings["ttl"] = ttl
+    if cacheonly is not None:
+        settings["cacheonly"] = cacheonly
+
+
+class PackageState:
+    """Installed/available version and repositories of one package, as seen by rpm/dnf"""
+    FIELDS = ("name", "installed", "info", "update_code", "update_output", "update_error", "repos",
+              "repos_error", "fetched")
+
+    def __init__(self, name, installed=None, info="", update_code=None, update_output="",
+                 update_error="", repos=None, repos_error=None, fetched=None):
+        self.name = name
+        self.installed = installed          # version-release o None
+        self.info = info                    # rpm -qi (o el mensaje de rpm si no esta)
+        self.update_code = update_code      # codigo de dnf check-update (100 = hay update)
+        self.update_output = update_output
+        self.update_error = update_error
+        self.repos = repos or []            # ids de repositorios habilitados
+        self.repos_error = repos_error      # mensaje si dnf repolist fallo (repos queda incompleto)
+        self.fetched = fetched if fetched is not None else time.time()
+
+    @property
+    def update_available(self):
+        return self.update_code == 100
+
+    def to_dict(self):
+        return {f: getattr(self, f) for f in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{f: data.get(f) for f in cls.FIELDS})
+
+
+def _dnf(*args):
+    argv = ["dnf", "-q"]
+    if settings["cacheonly"]:
+        argv.append("--cacheonly")
+    return argv + list(args)
+
+
+def _run(argv, timeout):
+    """transport.run that names the missing command (rpm or dnf) when it is not installed"""
+    try:
+        return get_transport().run(argv, timeout=timeout)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"{argv[0]} command not found")
+
+
+def query_package(name):
+    """Ask rpm/dnf about a package: rpmdb for what is installed, dnf once for updates"""
+    state = PackageState(name)
+
+    # rpmdb local: no descarga metadatos
+    installed = _run(["rpm", "-q", "--qf", "%{VERSION}-%{RELEASE}\\n", name], timeout=30)
+    if installed.returncode == 0:
+        state.installed = installed.stdout.strip().splitlines()[0]
+        state.info = _run(["rpm", "-qi", name], timeout=30).stdout.strip()
+    else:
+        state.info = (installed.stdout or installed.stderr).strip()
+
+    update = _run(_dnf("check-update", name), timeout=120)
+    state.update_code = update.returncode
+    state.update_output = update.stdout.strip()
+    state.update_error = update.stderr.strip()
+
+    # check-update ya dejo los metadatos al dia: repolist solo lee la cache
+    repos = _run(["dnf", "-q", "--cacheonly", "repolist", "--enabled"], timeout=60)
+    if repos.returncode != 0:
+        state.repos_error = repos.stderr.strip() or f"dnf repolist exited with code {repos.returncode}"
+        return state
+    for line in repos.stdout.splitlines()[1:]:
+        if line.strip():
+            state.repos.append(line.split()[0])
+    return state
+
+
+def _cache_key(name):
+    transport = get_transport()
+    return f"{getattr(transport, 'host', None) or 'localhost'}:{name}"
+
+
+def _load_cache():
+    try:
+        with open(settings["cache_file"], "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(data):
+    path = settings["cache_file"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def get_package_state(name="nginx"):
+    """Package state shared by 1.2.1 and 1.2.2, cached in memory and on disk for the TTL"""
+    def load():
+        key = _cache_key(name)
+        with _file_lock:
+            cached = _load_cache().get(key)
+        if cached and time.time() - cached.get("fetched", 0) < settings["ttl"]:
+            return PackageState.from_dict(cached)
+        state = query_package(name)
+        # un repolist fallido se vuelve a intentar en la proxima corrida
+        if settings["ttl"] > 0 and not state.repos_error:
+            with _file_lock:
+                data = _load_cache()
+                data[key] = state.to_dict()
+                _save_cache(data)
+        return state
+
+    return get_transport().memo(("package", name), load)
+
+
+def reset_package_state(name="nginx"):
+    """Forget cached state after installing/updating packages or editing repos"""
+    get_transport().forget(("package", name))
+    key = _cache_key(name)
+    with _file_lock:
+        data = _load_cache()
+        if data.pop(key, None) is not None:
+            _save_cache(data)
@@ -0,0 +1,182 @@
+import contextlib
+import contextvars
+import os
+import subprocess
+import time
+
+PROMETHEUS_PREFIX = "cis_nginx_control"
+
+_current = contextvars.ContextVar("profile", default=None)
+
+
+class Profile:
+    """Wall/CPU time, commands and file reads of one check() or remediate() call.
+
+    Values memoized per host (parsed config, accounts, build info...) are loaded by
+    whichever control asks first; what their load ran and read goes to the shared_*
+    fields of every control that uses them, so per-control numbers do not depend on
+    the order the controls ran in.
+    """
+    __slots__ = ("control", "phase", "wall", "cpu", "commands", "files_opened", "bytes_read",
+                 "shared_commands", "shared_files_opened", "shared_bytes_read", "_charged")
+
+    def __init__(self, control, phase="check"):
+        self.control = control
+        self.phase = phase
+        self.wall = 0.0
+        self.cpu = 0.0        # CPU del hilo que ejecuta el control (no la de los procesos hijos)
+        self.commands = []    # [(argv, segundos, returncode o None si no llego a terminar)]
+        self.files_opened = 0
+        self.bytes_read = 0
+        self.shared_commands = []
+        self.shared_files_opened = 0
+        self.shared_bytes_read = 0
+        self._charged = set()  # cargas ya cobradas (un valor usado dos veces cuenta una)
+
+    def to_dict(self):
+        return {
+            "wall": round(self.wall, 6),
+            "cpu": round(self.cpu, 6),
+            "commands": [
+                {"argv": argv, "duration": round(duration, 6), "returncode": code}
+                for argv, duration, code in self.commands
+            ],
+            "files_opened": self.files_opened,
+            "bytes_read": self.bytes_read,
+            "shared": {
+                "commands": [
+                    {"argv": argv, "duration": round(duration, 6), "returncode": code}
+                    for argv, duration, code in self.shared_commands
+                ],
+                "files_opened": self.shared_files_opened,
+                "bytes_read": self.shared_bytes_read,
+            },
+        }
+
+
+@contextlib.contextmanager
+def profiled(control, phase="check"):
+    """Collect a Profile of everything the enclosed code runs or reads in this context"""
+    profile = Profile(control, phase)
+    token = _current.set(profile)
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        yield profile
+    finally:
+        profile.wall = time.perf_counter() - wall
+        profile.cpu = time.thread_time() - cpu
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def shared_load():
+    """Collect apart what a memoized load runs and reads (None when nothing is profiled)"""
+    if _current.get() is None:
+        yield None
+        return
+    load = Profile(None, "shared")
+    token = _current.set(load)
+    try:
+        yield load
+    finally:
+        _current.reset(token)
+
+
+def charge_shared(load):
+    """Report a memoized load to the running profile as shared work it depends on"""
+    profile = _current.get()
+    if profile is not None and load is not None and id(load) not in profile._charged:
+        profile._charged.add(id(load))
+        profile.shared_commands.extend(load.commands + load.shared_commands)
+        profile.shared_files_opened += load.files_opened + load.shared_files_opened
+        profile.shared_bytes_read += load.bytes_read + load.shared_bytes_read
+
+
+def record_command(cmd, duration, returncode=None):
+    """Report one finished (or failed) command to the running profile, if any"""
+    profile = _current.get()
+    if profile is not None:
+        profile.commands.append((cmd, duration, returncode))
+
+
+def record_read(text):
+    """Report one file read (its content) to the running profile, if any"""
+    profile = _current.get()
+    if profile is not None:
+        profile.files_opened += 1
+        profile.bytes_read += len(text.encode(errors="replace")) if isinstance(text, str) else len(text)
+
+
+def timed(cmd, call):
+    """Run call() (which executes cmd) and report its duration and return code"""
+    start = time.perf_counter()
+    returncode = None
+    try:
+        result = call()
+        returncode = result.returncode
+        return result
+    except subprocess.CalledProcessError as e:
+        returncode = e.returncode
+        raise
+    finally:
+        record_command(cmd, time.perf_counter() - start, returncode)
+
+
+def run_command(cmd, *args, **kwargs):
+    """subprocess.run that reports to the profile of the running control"""
+    return timed(cmd, lambda: subprocess.run(cmd, *args, **kwargs))
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+_METRICS = (
+    ("wall_seconds", "Wall time of the control", lambda p: p["wall"]),
+    ("cpu_seconds", "CPU time of the thread running the control", lambda p: p["cpu"]),
+    ("subprocesses", "Commands spawned by the control", lambda p: len(p["commands"])),
+    ("subprocess_seconds", "Time spent waiting for the commands of the control",
+     lambda p: round(sum(c["duration"] for c in p["commands"]), 6)),
+    ("files_opened", "Files read by the control", lambda p: p["files_opened"]),
+    ("bytes_read", "Bytes read from files by the control", lambda p: p["bytes_read"]),
+    # trabajo de los valores compartidos por host que usa el control (cargados una sola vez)
+    ("shared_subprocesses", "Commands behind the shared per-host values the control used",
+     lambda p: len(p.get("shared", {}).get("commands", ()))),
+    ("shared_files_opened", "Files read for the shared per-host values the control used",
+     lambda p: p.get("shared", {}).get("files_opened", 0)),
+    ("shared_bytes_read", "Bytes read for the shared per-host values the control used",
+     lambda p: p.get("shared", {}).get("bytes_read", 0)),
+)
+
+
+def prometheus_text(documents):
+    """Prometheus text exposition of the profiles in runner/fleet documents"""
+    samples = []
+    for document in documents:
+        for phase, results in (("check", document.get("results", ())),
+                               ("remediate", (document.get("remediation") or {}).get("results", ()))):
+            for result in results:
+                if result.get("profile"):
+                    samples.append((document["host"], result["id"], phase, result["profile"]))
+    lines = []
+    for name, help_text, value in _METRICS:
+        metric = f"{PROMETHEUS_PREFIX}_{name}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for host, control, phase, profile in samples:
+            lines.append(f"{metric}{_labels(host=host, control=control, phase=phase)} {value(profile)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path, documents):
+    """Write the profiles atomically (node_exporter textfile collector reads it at any time)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text(documents))
+    os.replace(tmp, path)
@@ -0,0 +1,146 @@
+import contextlib
+import contextvars
+import os
+import re
+import subprocess
+from nginx_config import reset_config
+from profiling import record_read, run_command
+
+
+class RemediationError(Exception):
+    """nginx -t rejected the edited configuration (the edits were rolled back),
+    or the valid configuration was written but NGINX could not be reloaded"""
+
+
+class RemediationTransaction:
+    """Collects config edits, validates them once with nginx -t and reloads NGINX once"""
+
+    def __init__(self):
+        self._backups = {}   # archivo -> contenido original (None si no existia)
+        self.changed = []    # archivos modificados, en orden
+        self.writes = 0      # escrituras de archivos (para saber que remediacion edito algo)
+        self.validation = None
+        self.reloaded = False
+        self.result = None
+
+    def track(self, path):
+        """Keep the original content of a file before its first edit"""
+        self.writes += 1
+        if path in self._backups:
+            return
+        try:
+            with open(path, "r") as f:
+                self._backups[path] = f.read()
+        except FileNotFoundError:
+            self._backups[path] = None
+        self.changed.append(path)
+
+    def rollback(self):
+        """Restore every edited file to its original content"""
+        for path, content in self._backups.items():
+            if content is None:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                with open(path, "w") as f:
+                    f.write(content)
+        reset_config()
+
+    def commit(self):
+        """Validate with nginx -t and reload once; roll back if validation fails"""
+        if not self.changed:
+            return {"status": "NOOP", "output": "No configuration changes to apply"}
+        try:
+            result = run_command(
+                ["nginx", "-t"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True
+            )
+            self.validation = result.stdout.strip()
+            valid = result.returncode == 0
+        except FileNotFoundError:
+            self.validation = "nginx command not found"
+            valid = False
+        if not valid:
+            self.rollback()
+            self.result = {"status": "ROLLED_BACK", "output": self.validation, "files": list(self.changed)}
+            raise RemediationError(f"nginx -t failed, changes rolled back:\n{self.validation}")
+
+        try:
+            reload = run_command(
+                ["systemctl", "reload", "nginx"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True
+            )
+            reload_error = reload.stdout.strip() if reload.returncode != 0 else None
+        except FileNotFoundError:
+            reload_error = "systemctl command not found"
+        if reload_error is not None:
+            # la configuracion nueva es valida y queda escrita, pero nginx sigue con la anterior
+            self.result = {"status": "NOT_RELOADED", "output": reload_error or "systemctl reload nginx failed",
+                           "files": list(self.changed)}
+            raise RemediationError(f"nginx reload failed, changes written but not live:\n{self.result['output']}")
+        self.reloaded = True
+        return {
+            "status": "APPLIED",
+            "output": f"{len(self.changed)} file(s) changed, configuration valid, nginx reloaded once",
+            "files": list(self.changed)
+        }
+
+
+_current = contextvars.ContextVar("remediation", default=None)
+
+
+@contextlib.contextmanager
+def config_transaction():
+    """Join the running transaction, or open one that commits when the block ends"""
+    tx = _current.get()
+    if tx is not None:
+        yield tx
+        return
+    tx = RemediationTransaction()
+    token = _current.set(tx)
+    try:
+        yield tx
+    except Exception:
+        tx.rollback()
+        raise
+    finally:
+        _current.reset(token)
+    tx.result = tx.commit()
+
+
+def _write_lines(path, lines):
+    tx = _current.get()
+    if tx is not None:
+        tx.track(path)
+    with open(path, "w") as conf:
+        conf.writelines(lines)
+    reset_config()
+
+
+def set_directive(directive, value):
+    """Rewrite a directive's arguments in place in its source file"""
+    with open(directive.file, "r") as conf:
+        lines = conf.readlines()
+    record_read("".join(lines))
+    idx = directive.line - 1
+    pattern = re.compile(r"\b" + re.escape(directive.name) + r"\b[^;{]*;")
+    lines[idx], count = pattern.subn(f"{directive.name} {value};", lines[idx], count=1)
+    if count:
+        _write_lines(directive.file, lines)
+    return bool(count)
+
+
+def add_directive(path, text, block=None):
+    """Insert a directive at the top of a file, or right after the line with a block's opening brace"""
+    with open(path, "r") as conf:
+        lines = conf.readlines()
+    record_read("".join(lines))
+    if block is None:
+        lines.insert(0, f"{text}\n")
+    else:
+        lines.insert(block.open_line, f"    {text}\n")
+    _write_lines(path, lines)
@@ -0,0 +1,43 @@
+import json
+import sys
+from findings import Finding, to_json
+
+
+class NDJSONReporter:
+    """Writes one compact JSON line per control result and one per finding, as they arrive"""
+
+    def __init__(self, sink=None, host=None):
+        self.sink = sink if sink is not None else sys.stdout
+        self.host = host
+
+    def _write(self, record):
+        self.sink.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=to_json) + "\n")
+
+    def result(self, result, host=None):
+        """Emit a control record followed by its findings, one write per line"""
+        host = host if host is not None else self.host
+        findings = result.get("findings") or ()
+        record = {"type": "control", "host": host}
+        record.update((k, v) for k, v in result.items() if k != "findings")
+        record["findings"] = len(findings)
+        self._write(record)
+        for finding in findings:
+            if isinstance(finding, Finding):
+                self._write({"type": "finding", "host": host, **finding.to_dict()})
+            else:
+                self._write({"type": "finding", "host": host, "control": result["id"], "finding": finding})
+        self.sink.flush()
+
+    def document(self, document):
+        """Emit every result of a runner/fleet document, then its host summary"""
+        host = document["host"]
+        for result in document.get("results", ()):
+            self.result(result, host)
+        self.summary(document)
+
+    def summary(self, document):
+        """Host record: everything in the document except the per-control results"""
+        record = {"type": "host"}
+        record.update((k, v) for k, v in document.items() if k != "results")
+        self._write(record)
+        self.sink.flush()
@@ -0,0 +1,177 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+DEFAULT_STORE = os.path.expanduser("~/.cache/cis-nginx-audit/results.sqlite")
+DAY = 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts    (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS controls (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS statuses (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS outputs  (id INTEGER PRIMARY KEY, digest BLOB NOT NULL UNIQUE, text TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    host_id INTEGER NOT NULL,
+    started REAL NOT NULL,
+    duration REAL,
+    status_id INTEGER,   -- solo para hosts inalcanzables
+    output_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL,
+    host_id INTEGER NOT NULL,
+    control_id INTEGER NOT NULL,
+    status_id INTEGER NOT NULL,
+    started REAL NOT NULL,
+    output_id INTEGER NOT NULL,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS results_by_control ON results (control_id, status_id, started, host_id);
+CREATE INDEX IF NOT EXISTS results_by_host ON results (host_id, control_id, started);
+CREATE INDEX IF NOT EXISTS runs_by_host ON runs (host_id, started);
+"""
+
+
+def _epoch(started):
+    """ISO-8601 'started' of a result document as a Unix timestamp"""
+    if isinstance(started, (int, float)):
+        return float(started)
+    if started:
+        return datetime.fromisoformat(started).timestamp()
+    return time.time()
+
+
+def _output_text(result):
+    """Output plus one line per finding, as stored in the history"""
+    text = result.get("output", "")
+    text = text if isinstance(text, str) else json.dumps(text)
+    findings = result.get("findings")
+    if findings:
+        text += "\n" + "\n".join(map(str, findings))
+    return text
+
+
+class ResultStore:
+    """SQLite history of audit results; host, control, status and output are interned"""
+
+    def __init__(self, path=DEFAULT_STORE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self._ids = {}  # (tabla, valor) -> id, para no consultar en cada fila
+
+    def _intern(self, table, value):
+        key = (table, value)
+        if key not in self._ids:
+            self.db.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (value,))
+            row = self.db.execute(f"SELECT id FROM {table} WHERE name = ?", (value,)).fetchone()
+            self._ids[key] = row[0]
+        return self._ids[key]
+
+    def _output(self, text):
+        # las salidas se repiten run tras run: se guardan una sola vez por contenido
+        text = text if isinstance(text, str) else json.dumps(text)
+        digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        key = ("outputs", digest)
+        if key not in self._ids:
+            self.db.execute("INSERT OR IGNORE INTO outputs (digest, text) VALUES (?, ?)", (digest, text))
+            row = self.db.execute("SELECT id FROM outputs WHERE digest = ?", (digest,)).fetchone()
+            self._ids[key] = row[0]
+        return self._ids[key]
+
+    def record(self, document):
+        """Store one runner/fleet document in a single transaction; returns the run id"""
+        with self.db:
+            host_id = self._intern("hosts", document["host"])
+            started = _epoch(document.get("started"))
+            status_id = output_id = None
+            if "results" not in document:
+                status_id = self._intern("statuses", document.get("status", "ERROR"))
+                output_id = self._output(document.get("output", ""))
+            run_id = self.db.execute(
+                "INSERT INTO runs (host_id, started, duration, status_id, output_id) VALUES (?, ?, ?, ?, ?)",
+                (host_id, started, document.get("duration"), status_id, output_id)
+            ).lastrowid
+            self.db.executemany(
+                "INSERT INTO results (run_id, host_id, control_id, status_id, started, output_id, duration)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, host_id, self._intern("controls", r["id"]), self._intern("statuses", r["status"]),
+                     started, self._output(_output_text(r)), r.get("duration"))
+                    for r in document.get("results", ())
+                ]
+            )
+        return run_id
+
+    def failing_hosts(self, control, days=30, status="FAIL", now=None):
+        """[(host, times, last_seen)] of hosts with this status for a control in the last days"""
+        since = (now or time.time()) - days * DAY
+        rows = self.db.execute(
+            "SELECT h.name, COUNT(*), MAX(r.started) FROM results r"
+            " JOIN hosts h ON h.id = r.host_id"
+            " WHERE r.control_id = (SELECT id FROM controls WHERE name = ?)"
+            " AND r.status_id = (SELECT id FROM statuses WHERE name = ?)"
+            " AND r.started >= ?"
+            " GROUP BY r.host_id ORDER BY h.name",
+            (control, status, since)
+        )
+        return [(name, count, last) for name, count, last in rows]
+
+    def history(self, host, control, days=30, now=None):
+        """[(started, status, output)] of one control on one host, oldest first"""
+        since = (now or time.time()) - days * DAY
+        rows = self.db.execute(
+            "SELECT r.started, s.name, o.text FROM results r"
+            " JOIN statuses s ON s.id = r.status_id"
+            " JOIN outputs o ON o.id = r.output_id"
+            " WHERE r.host_id = (SELECT id FROM hosts WHERE name = ?)"
+            " AND r.control_id = (SELECT id FROM controls WHERE name = ?)"
+            " AND r.started >= ? ORDER BY r.started",
+            (host, control, since)
+        )
+        return rows.fetchall()
+
+    def close(self):
+        self.db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the stored audit history")
+    parser.add_argument("--db", default=DEFAULT_STORE, help="result store file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    failing = sub.add_parser("failing", help="hosts with a status for a control over the last days")
+    failing.add_argument("control")
+    failing.add_argument("--days", type=float, default=30)
+    failing.add_argument("--status", default="FAIL")
+    history = sub.add_parser("history", help="results of one control on one host")
+    history.add_argument("host")
+    history.add_argument("control")
+    history.add_argument("--days", type=float, default=30)
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.db)
+    try:
+        if args.command == "failing":
+            for host, count, last in store.failing_hosts(args.control, args.days, args.status):
+                print(json.dumps({"host": host, "count": count, "last": datetime.fromtimestamp(last).isoformat()}))
+        else:
+            for started, status, output in store.history(args.host, args.control, args.days):
+                print(json.dumps({"started": datetime.fromtimestamp(started).isoformat(), "status": status, "output": output}))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+import argparse
+import contextlib
+import contextvars
+import glob
+import importlib
+import os
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+import nginx_config
+import packages
+from build_planner import build_batch
+from executor import DEFAULT_LIMIT, EXECUTOR
+from findings import dumps
+from incremental import DEFAULT_STATE, IncrementalState, fingerprint
+from lynis import LynisIndex
+from profiling import profiled, write_prometheus
+from remediation import RemediationError, config_transaction
+from reporter import NDJSONReporter
+from result_store import DEFAULT_STORE, ResultStore
+from transport import RootTransport, get_transport, use_transport
+
+CONTROLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def discover_controls(only=None):
+    """Import every control_X_Y_Z module and instantiate its class"""
+    if CONTROLS_DIR not in sys.path:
+        sys.path.insert(0, CONTROLS_DIR)
+    controls = []
+    for path in sorted(glob.glob(os.path.join(CONTROLS_DIR, "control_*.py"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        module = importlib.import_module(name)
+        control = getattr(module, name)()
+        if only and control.id not in only:
+            continue
+        controls.append(control)
+    return controls
+
+
+def current_host():
+    return getattr(get_transport(), "host", None) or socket.gethostname()
+
+
+def run_control(control, state=None, profile=False):
+    """Run one control's check() and record its wall time (and its profile if asked)"""
+    start = time.perf_counter()
+    fp = None
+    result = None
+    with profiled(control.id) if profile else contextlib.nullcontext() as p:
+        try:
+            if state is not None:
+                fp = fingerprint(control)
+                result = state.reuse(current_host(), control, fp)
+            if result is not None:
+                result["cached"] = True
+            else:
+                result = dict(control.check())
+                if state is not None:
+                    state.record(current_host(), control, fp, result)
+        except Exception as e:
+            result = {"id": control.id, "status": "ERROR", "output": str(e)}
+    result["title"] = control.title
+    result["duration"] = round(time.perf_counter() - start, 6)
+    if p is not None:
+        result["profile"] = p.to_dict()
+    return result
+
+
+def run_audit(controls=None, workers=8, state=None, on_result=None, profile=False):
+    """Run all checks on a thread pool and merge the results in one document.
+
+    on_result, if given, is called with each result as soon as its control finishes.
+    profile adds to each result the wall/CPU time, commands and file reads of its check.
+    """
+    if controls is None:
+        controls = discover_controls()
+    started = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # cada hilo hereda el transporte (host) del que lanza la auditoria
+        futures = [pool.submit(contextvars.copy_context().run, run_control, c, state, profile) for c in controls]
+        if on_result is not None:
+            for future in as_completed(futures):
+                on_result(future.result())
+        results = [f.result() for f in futures]
+
+    summary = {}
+    for r in results:
+        summary[r["status"]] = summary.get(r["status"], 0) + 1
+
+    return {
+        "host": current_host(),
+        "started": started.isoformat(),
+        "duration": round(time.perf_counter() - start, 6),
+        "workers": workers,
+        "summary": summary,
+        "results": results,
+    }
+
+
+def remediate_control(control, profile=False):
+    """Run one control's remediate(), never raising"""
+    with profiled(control.id, "remediate") if profile else contextlib.nullcontext() as p:
+        try:
+            outcome = dict(control.remediate())
+        except Exception as e:
+            outcome = {"id": control.id, "status": "ERROR", "output": str(e)}
+    if p is not None:
+        outcome["profile"] = p.to_dict()
+    return outcome
+
+
+def run_remediation(controls, results, profile=False):
+    """Remediate every failing control; config edits share one nginx -t and one reload,
+    source rebuilds share one configure/make"""
+    by_id = {c.id: c for c in controls}
+    failing = [by_id[r["id"]] for r in results if r["status"] == "FAIL" and r["id"] in by_id]
+    outcomes = []
+    edited = set()  # controles que escribieron archivos de configuracion
+    tx = None
+    # el perfil del lote se queda con lo compartido: nginx -t, recarga y compilacion
+    with profiled("batch", "commit") if profile else contextlib.nullcontext() as p:
+        with build_batch() as plan:
+            try:
+                # en serie: varias remediaciones editan los mismos archivos
+                with config_transaction() as tx:
+                    for control in failing:
+                        writes = tx.writes
+                        outcomes.append(remediate_control(control, profile))
+                        if tx.writes > writes:
+                            edited.add(control.id)
+            except RemediationError:
+                # nginx -t rechazo el lote (ediciones deshechas) o la recarga fallo (escritas, no activas)
+                status = tx.result["status"]
+                note = ("rolled back: nginx -t rejected the batch" if status == "ROLLED_BACK"
+                        else "written but not live: nginx reload failed")
+                for outcome in outcomes:
+                    if outcome["id"] in edited and outcome["status"] == "REMEDIATED":
+                        outcome["status"] = status
+                        if status == "ROLLED_BACK" and "rolled_back_output" in outcome:
+                            outcome["output"] = outcome["rolled_back_output"]
+                        outcome["output"] += f"\n({note})"
+    for outcome in outcomes:
+        # texto alternativo para un lote deshecho; no se publica
+        outcome.pop("rolled_back_output", None)
+    remediation = {
+        "results": outcomes,
+        "transaction": tx.result if tx is not None else None,
+        "build": plan.result
+    }
+    if p is not None:
+        remediation["profile"] = p.to_dict()
+    return remediation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run every CIS NGINX control and print one JSON report")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="number of checks run concurrently")
+    parser.add_argument("--only", nargs="+", metavar="ID", help="only run these control ids (e.g. 2.4.3)")
+    parser.add_argument("-o", "--output", help="write the report to this file instead of stdout")
+    parser.add_argument("--format", choices=("json", "ndjson"), default="json", help="one JSON document, or one compact line per control/finding streamed as checks finish")
+    parser.add_argument("-i", "--incremental", action="store_true", help="reuse results of controls whose inputs did not change")
+    parser.add_argument("--state", default=DEFAULT_STATE, help="state file used by --incremental")
+    parser.add_argument("--full-every", type=float, default=24, metavar="HOURS", help="force a full re-check after this many hours")
+    parser.add_argument("--remediate", action="store_true", help="remediate failing controls (one validation and reload at the end)")
+    parser.add_argument("--cacheonly", action="store_true", help="never let dnf download repository metadata")
+    parser.add_argument("--package-ttl", type=float, default=packages.DEFAULT_TTL, metavar="SECONDS", help="reuse cached rpm/dnf results for this long")
+    parser.add_argument("--nginx-T", dest="dump", action="store_true", help="read the configuration from one 'nginx -T' dump instead of opening each file")
+    parser.add_argument("--max-procs", type=int, default=DEFAULT_LIMIT, help="maximum number of commands running at the same time")
+    parser.add_argument("--store", nargs="?", const=DEFAULT_STORE, metavar="DB", help="also append the results to the SQLite history (default %(const)s)")
+    parser.add_argument("--lynis", metavar="REPORT", help="attach the findings of this host's Lynis report")
+    parser.add_argument("--profile", action="store_true", help="add wall/CPU time, commands and file reads to each result")
+    parser.add_argument("--prometheus", metavar="FILE", help="also write the profiles in Prometheus text format (implies --profile)")
+    parser.add_argument("--root", metavar="DIR", help="audit the filesystem below DIR (mounted image, extracted backup, fixture) instead of /")
+    args = parser.parse_args(argv)
+    if args.root and args.remediate:
+        parser.error("--remediate cannot be used with --root (nothing runs inside the root)")
+    if args.root and not os.path.isdir(args.root):
+        parser.error(f"--root {args.root} is not a directory")
+
+    EXECUTOR.configure(limit=args.max_procs)
+    packages.configure(ttl=args.package_ttl, cacheonly=args.cacheonly)
+    if args.dump:
+        nginx_config.configure(source="dump")
+    # --root: las rutas (/etc/nginx, /etc/passwd...) se leen dentro de ese directorio
+    target = use_transport(RootTransport(args.root)) if args.root else contextlib.nullcontext()
+    with target:
+        state = IncrementalState(args.state, args.full_every * 3600) if args.incremental else None
+        controls = discover_controls(args.only)
+        out = open(args.output, "w") if args.output else sys.stdout
+        reporter = NDJSONReporter(out, host=current_host()) if args.format == "ndjson" else None
+        profile = args.profile or bool(args.prometheus)
+        document = run_audit(controls, workers=args.workers, state=state,
+                             on_result=reporter.result if reporter is not None else None, profile=profile)
+        if args.remediate:
+            document["remediation"] = run_remediation(controls, document["results"], profile)
+        if args.lynis:
+            index = LynisIndex()
+            index.add(args.lynis, host=document["host"])
+            index.join(document)
+        if state is not None:
+            state.save()
+        if args.store:
+            store = ResultStore(args.store)
+            store.record(document)
+            store.close()
+        if args.prometheus:
+            write_prometheus(args.prometheus, [document])
+        if reporter is not None:
+            reporter.summary({k: v for k, v in document.items() if k != "results"})
+        else:
+            out.write(dumps(document, indent=4) + "\n")
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+from nginx_config import parse, tokenize
+
+
+def test_variable_braces_stay_in_the_word():
+    directives = parse("server {\n    rewrite ^/(.*)$ /p${1}q last;\n    autoindex on;\n}\n", "nginx.conf")
+
+    server = directives[0]
+    assert [d.name for d in server.children] == ["rewrite", "autoindex"]
+    assert server.children[0].args == ["^/(.*)$", "/p${1}q", "last"]
+    assert not server.children[0].is_block
+
+
+def test_closing_brace_does_not_end_a_word():
+    tokens = [tok for tok, _, _ in tokenize("set $a ${b}c};")]
+    assert tokens == ["set", "$a", "${b}c}", ";"]
+
+
+def test_punctuation_at_token_start():
+    tokens = [tok for tok, _, _ in tokenize("location /{autoindex on;}")]
+    assert tokens == ["location", "/", "{", "autoindex", "on", ";", "}"]
@@ -0,0 +1,24 @@
+from nginx_config import load_config
+from remediation import add_directive
+
+
+def test_add_directive_after_brace_on_next_line(tmp_path):
+    conf = tmp_path / "nginx.conf"
+    conf.write_text("http\n{\n    server {\n    }\n}\n")
+    http = load_config(str(conf)).find("http")[0]
+
+    add_directive(str(conf), "send_timeout 10;", block=http)
+
+    assert conf.read_text() == "http\n{\n    send_timeout 10;\n    server {\n    }\n}\n"
+    config = load_config(str(conf))
+    assert [d.parent.name for d in config.find("send_timeout")] == ["http"]
+
+
+def test_add_directive_after_brace_on_same_line(tmp_path):
+    conf = tmp_path / "nginx.conf"
+    conf.write_text("events {}\nhttp {\n}\n")
+    http = load_config(str(conf)).find("http")[0]
+
+    add_directive(str(conf), "keepalive_timeout 10;", block=http)
+
+    assert conf.read_text() == "events {}\nhttp {\n    keepalive_timeout 10;\n}\n"
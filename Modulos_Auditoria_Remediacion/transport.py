@@ -0,0 +1,526 @@
+import contextlib
+import contextvars
+import glob
+import grp
+import os
+import posixpath
+import pwd
+import shlex
+import shutil
+import stat
+import subprocess
+import tempfile
+import threading
+import time
+from executor import EXECUTOR
+from profiling import charge_shared, record_read, shared_load, timed
+
+
+class Transport:
+    """Where the audit runs commands and reads files (this host or a remote one)"""
+    name = "transport"
+    live = True  # hay un sistema en marcha detras (servicios a los que conectarse)
+
+    def __init__(self):
+        self.deadline = None  # time.monotonic() limite para este host (fleet)
+        self._memo = {}
+        self._memo_locks = {}
+        self._memo_lock = threading.Lock()
+
+    def memo(self, key, factory):
+        """Compute a per-host value once; concurrent callers wait for the first one.
+
+        Every caller is charged (in its profile) with what computing the value cost.
+        """
+        with self._memo_lock:
+            if key in self._memo:
+                value, load = self._memo[key]
+                charge_shared(load)
+                return value
+            lock = self._memo_locks.setdefault(key, threading.Lock())
+        with lock:
+            with self._memo_lock:
+                if key in self._memo:
+                    value, load = self._memo[key]
+                    charge_shared(load)
+                    return value
+            with shared_load() as load:
+                value = factory()
+            with self._memo_lock:
+                self._memo[key] = (value, load)
+            charge_shared(load)
+            return value
+
+    def forget(self, key):
+        """Drop a memoized value so the next memo() call recomputes it"""
+        with self._memo_lock:
+            self._memo.pop(key, None)
+
+    def _timeout(self, timeout):
+        """Shorten a command timeout so it never goes past the host deadline"""
+        if self.deadline is None:
+            return timeout
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired("host deadline", 0)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def run(self, cmd, shell=False, timeout=None, merge_stderr=False):
+        """Run a command and return a text-mode subprocess.CompletedProcess"""
+        raise NotImplementedError
+
+    def read_text(self, path):
+        raise NotImplementedError
+
+    def exists(self, path):
+        raise NotImplementedError
+
+    def stat(self, path):
+        raise NotImplementedError
+
+    def scan(self, top):
+        """Yield (path, is_dir, stat_result, error) for everything below top, one stat each"""
+        raise NotImplementedError
+
+    def glob(self, pattern):
+        raise NotImplementedError
+
+    def realpath(self, path):
+        """Canonical path with every symlink resolved"""
+        raise NotImplementedError
+
+    def which(self, command):
+        raise NotImplementedError
+
+    def getpwnam(self, name):
+        raise NotImplementedError
+
+    def getpwuid(self, uid):
+        raise NotImplementedError
+
+    def getgrnam(self, name):
+        raise NotImplementedError
+
+    def getgrgid(self, gid):
+        raise NotImplementedError
+
+    def getgrall(self):
+        raise NotImplementedError
+
+    def getgrouplist(self, user, gid):
+        """gids a user belongs to: its primary gid plus supplementary groups"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalTransport(Transport):
+    """Runs everything on this host with subprocess/os/pwd/grp"""
+    name = "local"
+
+    def run(self, cmd, shell=False, timeout=None, merge_stderr=False):
+        return timed(cmd, lambda: EXECUTOR.run(cmd, shell=shell, timeout=self._timeout(timeout), merge_stderr=merge_stderr))
+
+    def read_text(self, path):
+        with open(path, "r", errors="replace") as f:
+            text = f.read()
+        record_read(text)
+        return text
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def stat(self, path):
+        return os.stat(path)
+
+    def scan(self, top):
+        stack = [top]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    try:
+                        # igual que os.stat: sigue enlaces simbolicos
+                        st = entry.stat()
+                    except OSError as e:
+                        yield entry.path, False, None, str(e)
+                        continue
+                    yield entry.path, stat.S_ISDIR(st.st_mode), st, None
+                    # como os.walk, no se desciende por enlaces a directorios
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+
+    def glob(self, pattern):
+        return glob.glob(pattern)
+
+    def realpath(self, path):
+        return os.path.realpath(path)
+
+    def which(self, command):
+        return shutil.which(command)
+
+    def getpwnam(self, name):
+        return pwd.getpwnam(name)
+
+    def getpwuid(self, uid):
+        return pwd.getpwuid(uid)
+
+    def getgrnam(self, name):
+        return grp.getgrnam(name)
+
+    def getgrgid(self, gid):
+        return grp.getgrgid(gid)
+
+    def getgrall(self):
+        return grp.getgrall()
+
+    def getgrouplist(self, user, gid):
+        # initgroups de NSS: no enumera todos los grupos del directorio
+        return os.getgrouplist(user, gid)
+
+
+class AccountIndex:
+    """passwd/group lookups answered from one read of each database, indexed in memory.
+
+    Subclasses provide _account_lines() and set _lock, _passwd = None and _group = None.
+    """
+
+    def _account_lines(self, database):
+        """Every entry of passwd or group, split on ':'"""
+        raise NotImplementedError
+
+    def _load_accounts(self):
+        """Fetch passwd/group once and index them by name, id and member"""
+        with self._lock:
+            if self._passwd is not None:
+                return
+            passwd = [
+                pwd.struct_passwd((f[0], f[1], int(f[2]), int(f[3]), f[4], f[5], f[6]))
+                for f in self._account_lines("passwd") if len(f) >= 7
+            ]
+            group = [
+                grp.struct_group((f[0], f[1], int(f[2]), [m for m in f[3].split(",") if m]))
+                for f in self._account_lines("group") if len(f) >= 4
+            ]
+            self._group = group
+            self._pw_by_name = {p.pw_name: p for p in reversed(passwd)}
+            self._pw_by_uid = {p.pw_uid: p for p in reversed(passwd)}
+            self._gr_by_name = {g.gr_name: g for g in reversed(group)}
+            self._gr_by_gid = {g.gr_gid: g for g in reversed(group)}
+            self._member_of = {}
+            for g in group:
+                for member in g.gr_mem:
+                    self._member_of.setdefault(member, set()).add(g.gr_gid)
+            self._passwd = passwd
+
+    def getpwnam(self, name):
+        self._load_accounts()
+        try:
+            return self._pw_by_name[name]
+        except KeyError:
+            raise KeyError(f"getpwnam(): name not found: '{name}'") from None
+
+    def getpwuid(self, uid):
+        self._load_accounts()
+        try:
+            return self._pw_by_uid[uid]
+        except KeyError:
+            raise KeyError(f"getpwuid(): uid not found: {uid}") from None
+
+    def getgrnam(self, name):
+        self._load_accounts()
+        try:
+            return self._gr_by_name[name]
+        except KeyError:
+            raise KeyError(f"getgrnam(): name not found: '{name}'") from None
+
+    def getgrgid(self, gid):
+        self._load_accounts()
+        try:
+            return self._gr_by_gid[gid]
+        except KeyError:
+            raise KeyError(f"getgrgid(): gid not found: {gid}") from None
+
+    def getgrall(self):
+        self._load_accounts()
+        return list(self._group)
+
+    def getgrouplist(self, user, gid):
+        self._load_accounts()
+        return [gid] + sorted(self._member_of.get(user, set()) - {gid})
+
+
+class SSHTransport(Transport):
+    """Runs commands on a remote host over one multiplexed ssh connection"""
+    name = "ssh"
+
+    def __init__(self, host, user=None, port=None, connect_timeout=10, ssh_options=()):
+        super().__init__()
+        self.host = host
+        self.user = user
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.ssh_options = list(ssh_options)
+        self._control_dir = tempfile.mkdtemp(prefix="cis-nginx-ssh-")
+
+    def _ssh_argv(self):
+        argv = [
+            "ssh",
+            "-o", "BatchMode=yes",
+            "-o", f"ConnectTimeout={self.connect_timeout}",
+            # una sola conexion TCP por host, reutilizada por todos los comandos
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={self._control_dir}/%C",
+            "-o", "ControlPersist=120",
+        ]
+        if self.port:
+            argv += ["-p", str(self.port)]
+        argv += self.ssh_options
+        argv.append(f"{self.user}@{self.host}" if self.user else self.host)
+        return argv
+
+    def run(self, cmd, shell=False, timeout=None, merge_stderr=False):
+        remote = cmd if shell else shlex.join(cmd)
+        if merge_stderr:
+            remote = f"{{ {remote}; }} 2>&1"
+        # se informa el comando remoto, no la linea de ssh que lo envuelve
+        result = timed(cmd, lambda: EXECUTOR.run(self._ssh_argv() + ["--", remote], timeout=self._timeout(timeout)))
+        if result.returncode == 255:
+            raise ConnectionError(f"ssh to {self.host} failed: {result.stderr.strip()}")
+        if result.returncode == 127 and not shell:
+            # mismo comportamiento que subprocess cuando el binario no existe
+            raise FileNotFoundError(cmd[0])
+        return subprocess.CompletedProcess(cmd, result.returncode, result.stdout, result.stderr)
+
+    def read_text(self, path):
+        result = self.run(["cat", "--", path])
+        if result.returncode != 0:
+            if "No such file" in result.stderr:
+                raise FileNotFoundError(path)
+            raise OSError(result.stderr.strip() or f"cannot read {path}")
+        record_read(result.stdout)
+        return result.stdout
+
+    def exists(self, path):
+        return self.run(["test", "-e", path]).returncode == 0
+
+    def stat(self, path):
+        result = self.run(["stat", "-L", "-c", "%f %i %d %h %u %g %s %X %Y %Z", "--", path])
+        if result.returncode != 0:
+            raise FileNotFoundError(path)
+        fields = result.stdout.split()
+        values = [int(fields[0], 16)] + [int(v) for v in fields[1:]]
+        return os.stat_result(values)
+
+    def scan(self, top):
+        """Same listing as LocalTransport.scan from a single remote find + stat"""
+        result = self.run([
+            "find", top, "-mindepth", "1",
+            "-xtype", "l", "-printf", "E\t%p\n",
+            "-o", "-exec", "stat", "-L", "-c", "S\t%f\t%i\t%d\t%h\t%u\t%g\t%s\t%X\t%Y\t%Z\t%n", "{}", "+",
+        ])
+        for line in result.stdout.splitlines():
+            if line.startswith("E\t"):
+                yield line[2:], False, None, "broken symbolic link"
+                continue
+            fields = line.split("\t", 11)
+            if len(fields) != 12:
+                continue
+            values = [int(fields[1], 16)] + [int(v) for v in fields[2:11]]
+            st = os.stat_result(values)
+            yield fields[11], stat.S_ISDIR(st.st_mode), st, None
+
+    def _getent(self, database, key, error):
+        """One NSS entry by name or id, split on ':' (only that entry: works with LDAP/SSSD
+        directories that do not enumerate)"""
+        result = self.run(["getent", database, "--", str(key)])
+        line = result.stdout.split("\n", 1)[0]
+        if result.returncode != 0 or not line:
+            raise KeyError(error)
+        return line.split(":")
+
+    def getpwnam(self, name):
+        f = self._getent("passwd", name, f"getpwnam(): name not found: '{name}'")
+        return pwd.struct_passwd((f[0], f[1], int(f[2]), int(f[3]), f[4], f[5], f[6]))
+
+    def getpwuid(self, uid):
+        f = self._getent("passwd", uid, f"getpwuid(): uid not found: {uid}")
+        return pwd.struct_passwd((f[0], f[1], int(f[2]), int(f[3]), f[4], f[5], f[6]))
+
+    def getgrnam(self, name):
+        f = self._getent("group", name, f"getgrnam(): name not found: '{name}'")
+        return grp.struct_group((f[0], f[1], int(f[2]), [m for m in f[3].split(",") if m]))
+
+    def getgrgid(self, gid):
+        f = self._getent("group", gid, f"getgrgid(): gid not found: {gid}")
+        return grp.struct_group((f[0], f[1], int(f[2]), [m for m in f[3].split(",") if m]))
+
+    def getgrall(self):
+        result = self.run(["getent", "group"])
+        return [
+            grp.struct_group((f[0], f[1], int(f[2]), [m for m in f[3].split(",") if m]))
+            for f in (line.split(":") for line in result.stdout.splitlines() if line) if len(f) >= 4
+        ]
+
+    def getgrouplist(self, user, gid):
+        # id -G resuelve los grupos del usuario con initgroups (sin enumerar el directorio)
+        result = self.run(["id", "-G", "--", user])
+        gids = [int(g) for g in result.stdout.split()] if result.returncode == 0 else []
+        return [gid] + sorted(set(gids) - {gid})
+
+    def glob(self, pattern):
+        # el patron va como argumento: el shell remoto solo lo expande como glob (IFS vacio: sin partir)
+        script = 'IFS=; for f in $1; do [ -e "$f" ] && printf "%s\\n" "$f"; done'
+        result = self.run(["sh", "-c", script, "_", pattern])
+        return result.stdout.splitlines()
+
+    def realpath(self, path):
+        result = self.run(["readlink", "-m", "--", path])
+        return result.stdout.strip() or path
+
+    def which(self, command):
+        result = self.run(f"command -v {shlex.quote(command)}", shell=True)
+        path = result.stdout.strip()
+        return path or None
+
+    def close(self):
+        """Close the shared ssh master connection"""
+        subprocess.run(
+            self._ssh_argv()[:-1] + ["-O", "exit", self._ssh_argv()[-1]],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        shutil.rmtree(self._control_dir, ignore_errors=True)
+
+
+class RootTransport(AccountIndex, LocalTransport):
+    """Reads files below a directory as if it were / (a fixture tree, an extracted image).
+
+    Paths given and returned are the ones seen inside the root; accounts come from the
+    root's own etc/passwd and etc/group. Commands cannot run inside a root that is not
+    booted, so run() fails like a missing binary and remediation is not possible.
+    """
+    name = "root"
+    live = False
+
+    def __init__(self, root, host=None):
+        super().__init__()
+        if not os.path.isdir(root):
+            # una raiz mal escrita no debe convertirse en una auditoria limpia
+            raise NotADirectoryError(f"audit root {root} is not a directory")
+        self.root = os.path.abspath(root)
+        self.host = host or self.root  # nombre del "host" en los informes
+        self._lock = threading.Lock()
+        self._passwd = None
+        self._group = None
+
+    def _host(self, path):
+        """Host path of a path inside the root; neither .. nor symlinks leave the root"""
+        return os.path.join(self.root, self.realpath(path).lstrip("/"))
+
+    def _image(self, path):
+        """Path inside the root of a host path below it"""
+        rel = os.path.relpath(path, self.root)
+        return "/" if rel == "." else "/" + rel
+
+    def run(self, cmd, shell=False, timeout=None, merge_stderr=False):
+        raise FileNotFoundError(cmd if shell else cmd[0])
+
+    def read_text(self, path):
+        return super().read_text(self._host(path))
+
+    def exists(self, path):
+        return super().exists(self._host(path))
+
+    def stat(self, path):
+        return super().stat(self._host(path))
+
+    def scan(self, top):
+        top = self.realpath(top)
+        stack = [(self._host(top), top)]
+        while stack:
+            directory, image_dir = stack.pop()
+            try:
+                it = os.scandir(directory)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    image_path = posixpath.join(image_dir, entry.name)
+                    try:
+                        if entry.is_symlink():
+                            # el destino se resuelve dentro de la raiz, no en este host
+                            st = os.stat(self._host(image_path))
+                        else:
+                            st = entry.stat(follow_symlinks=False)
+                    except OSError as e:
+                        # sin la ruta del host en el mensaje (igual que SSHTransport.scan)
+                        error = "broken symbolic link" if isinstance(e, FileNotFoundError) else e.strerror
+                        yield image_path, False, None, error
+                        continue
+                    yield image_path, stat.S_ISDIR(st.st_mode), st, None
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, image_path))
+
+    def glob(self, pattern):
+        return [self._image(p) for p in super().glob(self._host(pattern))]
+
+    def realpath(self, path):
+        # como un chroot: los enlaces absolutos apuntan dentro de la raiz, no a este host
+        pending = [p for p in os.path.normpath("/" + path).split("/") if p]
+        resolved = []
+        hops = 0
+        while pending:
+            part = pending.pop(0)
+            if part == "..":
+                if resolved:
+                    resolved.pop()
+                continue
+            if part == ".":
+                continue
+            try:
+                target = os.readlink(os.path.join(self.root, *resolved, part))
+            except OSError:
+                resolved.append(part)
+                continue
+            hops += 1
+            if hops > 40:
+                # bucle de enlaces (ELOOP): se devuelve lo que queda sin resolver
+                return "/" + "/".join(resolved + [part] + pending)
+            if target.startswith("/"):
+                resolved = []
+            pending = [p for p in target.split("/") if p] + pending
+        return "/" + "/".join(resolved)
+
+    def which(self, command):
+        return None
+
+    def _account_lines(self, database):
+        try:
+            text = self.read_text(f"/etc/{database}")
+        except OSError:
+            return []
+        return [line.split(":") for line in text.splitlines() if line and not line.startswith("#")]
+
+
+LOCAL = LocalTransport()
+_current = contextvars.ContextVar("transport", default=LOCAL)
+
+
+def get_transport():
+    """Transport the running check() should use"""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def use_transport(transport):
+    """Run the enclosed checks against another transport"""
+    token = _current.set(transport)
+    try:
+        yield transport
+    finally:
+        _current.reset(token)